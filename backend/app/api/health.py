@@ -1,17 +1,23 @@
 """Health and readiness endpoints."""
 
-from fastapi import APIRouter, Depends
+from functools import lru_cache
+
+from fastapi import APIRouter, Depends, Response
 
 from app.core.config import Settings, get_settings
+from app.core.responses import dumps
 from app.schemas.common import HealthResponse
 
 router = APIRouter(tags=["health"])
 
 
-@router.get("/health", response_model=HealthResponse)
-def health_check(settings: Settings = Depends(get_settings)) -> HealthResponse:
+@lru_cache(maxsize=8)
+def _health_body(environment: str) -> bytes:
+    """Serialized HealthResponse; settings are constant at runtime, so build it once."""
+    return dumps(HealthResponse(status="ok", environment=environment))
+
+
+@router.get("/health", responses={200: {"model": HealthResponse}})
+def health_check(settings: Settings = Depends(get_settings)) -> Response:
     """Return service health and environment."""
-    return HealthResponse(
-        status="ok",
-        environment=settings.environment,
-    )
+    return Response(content=_health_body(settings.environment), media_type="application/json")
@@ -20,7 +20,20 @@ def set_kv(body: KvSetBody) -> dict[str, str]:
     """Set a key-value pair in Valkey."""
     try:
         client = get_client()
-        client.set(body.key, body.value.encode("utf-8"))
+        client.set(body.key, body.value)
         return {"ok": "true"}
     except Exception as e:
         raise HTTPException(status_code=503, detail=str(e)) from e
+
+
+@router.post("/kv/bulk")
+def set_kv_bulk(body: list[KvSetBody]) -> dict[str, str]:
+    """Set many key-value pairs in Valkey with a single MSET (later duplicates win)."""
+    if not body:
+        raise HTTPException(status_code=400, detail="At least one key-value pair is required")
+    try:
+        client = get_client()
+        client.mset({item.key: item.value for item in body})
+        return {"ok": "true", "count": str(len(body))}
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=str(e)) from e
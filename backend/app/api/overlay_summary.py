@@ -1,89 +1,150 @@
 """Overlay summary API: top-3 high-risk attributes + evidence for a domain."""
 
 import logging
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
 from typing import Any
 
-from fastapi import APIRouter, HTTPException, Query
-
-from app.queries import get_json
-from app.api.tos_processor.models import PolicyAnalysis
-from app.severity_store import get_site_attributes
+import msgspec
+from fastapi import APIRouter, HTTPException, Query, Response
+
+from app.core.config import get_settings
+from app.core.responses import dumps
+from app.db import get_client
+from app.api.tos_processor.models import DataCollectionSection
+from app.api.tos_processor.models_fast import OVERLAY_ANALYSIS_DECODER, OverlayAnalysis
+from app.severity_store import (
+    ATTRIBUTE_TO_SECTION_TYPE,
+    SITE_OVERLAY_PREFIX,
+    get_overlay_bundle,
+)
 from app.utils.url_utils import get_domain
 
 router = APIRouter(prefix="/overlay_summary", tags=["overlay_summary"])
 logger = logging.getLogger(__name__)
 
 TOS_CACHE_PREFIX = "tos:process:"
-
-# Map each attribute name to its data-collection section type (for deduplicating by type in overlay).
-# Section types align with data_collection in PolicyAnalysis: one entry per "category" of data.
-ATTRIBUTE_TO_SECTION_TYPE: dict[str, str] = {
-    # personal_identifiers
-    "name": "personal_identifiers",
-    "email": "personal_identifiers",
-    "phone_number": "personal_identifiers",
-    "physical_address": "personal_identifiers",
-    "date_of_birth": "personal_identifiers",
-    "government_id": "personal_identifiers",
-    "financial_account": "personal_identifiers",
-    "biometric": "sensitive_data",
-    "photo": "personal_identifiers",
-    "gender": "personal_identifiers",
-    "nationality": "personal_identifiers",
-    "race_ethnicity": "sensitive_data",
-    # ip_address (own section)
-    "ip_address": "ip_address",
-    # precise_location
-    "precise_gps": "precise_location",
-    "coarse_location": "precise_location",
-    "wifi_cell": "precise_location",
-    "ip_derived": "precise_location",
-    # device_fingerprinting
-    "device_id": "device_fingerprinting",
-    "browser_info": "device_fingerprinting",
-    "os": "device_fingerprinting",
-    "screen_resolution": "device_fingerprinting",
-    "language": "device_fingerprinting",
-    "timezone": "device_fingerprinting",
-    "fingerprint": "device_fingerprinting",
-    # user_content
-    "posts": "user_content",
-    "messages": "user_content",
-    "photos": "user_content",
-    "videos": "user_content",
-    "search_history": "user_content",
-    "purchase_history": "user_content",
-    "contacts": "user_content",
-    # third_party_data
-    "social_media": "third_party_data",
-    "advertisers": "third_party_data",
-    "analytics": "third_party_data",
-    "data_brokers": "third_party_data",
-    "affiliates": "third_party_data",
-    # sensitive_data
-    "health": "sensitive_data",
-    "genetic": "sensitive_data",
-    "political": "sensitive_data",
-    "religious": "sensitive_data",
-    "sexual_orientation": "sensitive_data",
-    "union_membership": "sensitive_data",
-    "criminal": "sensitive_data",
-    # age/special (treat as sensitive for overlay)
-    "age_under_13": "sensitive_data",
-    "age_13_to_17": "sensitive_data",
-    "parental_consent_required": "sensitive_data",
+# Overlay payload precomputed when a domain is processed: tos:overlay:{domain} -> JSON bytes.
+# Deleted whenever the severity map changes (severity_store.set_attribute_severity_map).
+OVERLAY_CACHE_PREFIX = SITE_OVERLAY_PREFIX
+
+# Decoded overlay view of the cached analysis per normalized domain:
+# domain -> (deadline, generation, analysis), LRU ordered. generation is the value of the
+# domain's generation key when the analysis was read (see invalidate_cached_analysis).
+_analysis_cache: OrderedDict[str, tuple[float, bytes | None, OverlayAnalysis]] = OrderedDict()
+_analysis_cache_lock = threading.Lock()
+
+# Display titles for the known (closed) attribute namespace, built once at import.
+_TITLE_BY_ATTR: dict[str, str] = {
+    attr: attr.replace("_", " ").title() for attr in ATTRIBUTE_TO_SECTION_TYPE
 }
 
-
-def _attribute_section_type(attr_name: str) -> str:
-    """Return the data-collection section type for this attribute; fallback to attribute name if unknown."""
-    return ATTRIBUTE_TO_SECTION_TYPE.get(attr_name, attr_name)
+# Attribute -> DataCollectionSection field holding it, filtered once at import to keys that
+# exist on the model (ip_address is its own Signal section).
+_DATA_COLLECTION_SECTION_BY_ATTR: dict[str, str] = {
+    attr: section_key
+    for attr, section_key in ATTRIBUTE_TO_SECTION_TYPE.items()
+    if section_key in DataCollectionSection.model_fields
+}
 
 
 def _cache_key_for_domain(domain: str) -> str:
     return f"{TOS_CACHE_PREFIX}{domain}"
 
 
+def _overlay_key_for_domain(domain: str) -> str:
+    return f"{OVERLAY_CACHE_PREFIX}{domain}"
+
+
+def _generation_key_for_domain(domain: str) -> str:
+    """Counter bumped whenever the domain's cached analysis is rewritten (any worker)."""
+    return f"{_cache_key_for_domain(domain)}:gen"
+
+
+def _memoized_analysis(domain: str) -> tuple[bytes | None, OverlayAnalysis] | None:
+    """Return ``(generation, analysis)`` memoized for *domain* if it is within its TTL."""
+    now = time.monotonic()
+    with _analysis_cache_lock:
+        entry = _analysis_cache.get(domain)
+        if entry is not None and entry[0] > now:
+            _analysis_cache.move_to_end(domain)
+            return entry[1], entry[2]
+    return None
+
+
+def _remember_analysis(domain: str, generation: bytes | None, analysis: OverlayAnalysis) -> None:
+    """Memoize *analysis* for *domain* for the configured TTL, evicting least recently used."""
+    settings = get_settings()
+    with _analysis_cache_lock:
+        deadline = time.monotonic() + settings.overlay_cache_ttl_seconds
+        _analysis_cache[domain] = (deadline, generation, analysis)
+        _analysis_cache.move_to_end(domain)
+        while len(_analysis_cache) > settings.overlay_cache_max_entries:
+            _analysis_cache.popitem(last=False)
+
+
+def _decode_analysis(key: str, raw: bytes | None) -> OverlayAnalysis | None:
+    """Decode the overlay view of the analysis bytes read from *key*; None if missing/invalid."""
+    if raw is None:
+        return None
+    try:
+        return OVERLAY_ANALYSIS_DECODER.decode(raw)
+    except msgspec.DecodeError as e:
+        logger.warning("Cached analysis under %s is invalid: %s", key, e)
+        return None
+
+
+def _load_overlay_inputs(
+    domain: str, analysis_key: str | None = None
+) -> tuple[list[dict[str, Any]], OverlayAnalysis | None]:
+    """
+    Return ``(top red attributes, cached TOS analysis)`` for *domain* in one Valkey round-trip.
+
+    The analysis is read from *analysis_key* when given (e.g. the combined key of a
+    multi-domain request, not memoized), otherwise from the domain's own cache key.
+
+    Only the fields the overlay reads are decoded (msgspec view, ~10x cheaper than
+    validating the full PolicyAnalysis, which was validated before it was cached). The
+    view is memoized in-process for a short TTL along with the domain's generation, so
+    a repeat lookup only GETs the small generation value instead of the analysis, and a
+    rewrite by any worker (a new generation) is picked up on the next lookup. Misses are
+    not memoized so a freshly processed domain shows up immediately.
+    """
+    cache_key = _cache_key_for_domain(domain)
+    if analysis_key is not None and analysis_key != cache_key:
+        top_attrs, (raw,) = get_overlay_bundle(domain, analysis_key)
+        return top_attrs, _decode_analysis(analysis_key, raw)
+
+    generation_key = _generation_key_for_domain(domain)
+    memoized = _memoized_analysis(domain)
+    if memoized is not None:
+        top_attrs, (generation,) = get_overlay_bundle(domain, generation_key)
+        if generation == memoized[0]:
+            return top_attrs, memoized[1]
+
+    # The generation is bumped after the analysis is written and read here before it, so
+    # a rewrite in between memoizes the old generation and the next lookup reads again.
+    top_attrs, (generation, raw) = get_overlay_bundle(domain, generation_key, cache_key)
+    analysis = _decode_analysis(cache_key, raw)
+    if analysis is None:
+        return top_attrs, None
+    _remember_analysis(domain, generation, analysis)
+    return top_attrs, analysis
+
+
+def invalidate_cached_analysis(domain: str) -> None:
+    """
+    Drop the memoized analysis for *domain* in every worker: here directly, in the others
+    by bumping its generation key (INCR). Call after the TOS cache for *domain* is rewritten.
+    """
+    with _analysis_cache_lock:
+        _analysis_cache.pop(domain, None)
+    get_client().incr(_generation_key_for_domain(domain))
+
+
+@lru_cache(maxsize=2048)
 def _normalize_domain(raw_domain: str) -> str:
     """Normalize host/subdomain input to registered root domain."""
     candidate = raw_domain.strip()
@@ -98,67 +159,33 @@ def _normalize_domain(raw_domain: str) -> str:
 
 def _format_attribute_name(value: str) -> str:
     """Convert underscore-separated attribute names to Title Case."""
-    return value.replace("_", " ").title()
-
-
-def _get_section_for_attribute(attr: str, data_collection: dict[str, Any]) -> dict[str, Any] | None:
-    """Return the data_collection section dict that contains *attr* (for evidence, explanation, mitigation)."""
-    typed_sections = (
-        "personal_identifiers",
-        "precise_location",
-        "device_fingerprinting",
-        "user_content",
-        "third_party_data",
-        "sensitive_data",
-    )
-    for section_key in typed_sections:
-        section = data_collection.get(section_key)
-        if not isinstance(section, dict):
-            continue
-        types = section.get("types", [])
-        if isinstance(types, list) and attr in types:
-            return section
-    if attr == "ip_address":
-        ip_signal = data_collection.get("ip_address")
-        if isinstance(ip_signal, dict):
-            return ip_signal
-    return None
+    return _TITLE_BY_ATTR.get(value) or value.replace("_", " ").title()
 
 
-def _get_evidence_for_attribute(attr: str, analysis: dict[str, Any]) -> str:
-    """Return the first matching evidence string for *attr* from the cached analysis."""
-    data_collection: dict[str, Any] = analysis.get("data_collection", {})
-    section = _get_section_for_attribute(attr, data_collection)
-    if section:
-        evidence = section.get("evidence", "")
-        if evidence:
-            return str(evidence)
-    return ""
+def _get_section_for_attribute(attr: str, analysis: OverlayAnalysis) -> Any:
+    """Return the data_collection section model that holds *attr* (for evidence, explanation, mitigation)."""
+    section_key = _DATA_COLLECTION_SECTION_BY_ATTR.get(attr)
+    if section_key is None:
+        return None
+    return analysis.get_section(section_key)
 
 
-def _get_explanation_for_attribute(attr: str, analysis: dict[str, Any]) -> str:
-    """Return the explanation string for *attr* from the cached analysis."""
-    data_collection: dict[str, Any] = analysis.get("data_collection", {})
-    section = _get_section_for_attribute(attr, data_collection)
-    if section:
-        return str(section.get("explanation", "") or "")
-    return ""
+def _get_fields_for_attribute(attr: str, analysis: OverlayAnalysis | None) -> tuple[str, str, str]:
+    """Return ``(evidence, explanation, mitigation)`` for *attr*, resolving its section once."""
+    if analysis is None:
+        return "", "", ""
+    section = _get_section_for_attribute(attr, analysis)
+    if section is None:
+        return "", "", ""
+    return section.get_field("evidence"), section.get_field("explanation"), section.get_field("mitigation")
 
 
-def _get_mitigation_for_attribute(attr: str, analysis: dict[str, Any]) -> str:
-    """Return the mitigation string for *attr* from the cached analysis."""
-    data_collection: dict[str, Any] = analysis.get("data_collection", {})
-    section = _get_section_for_attribute(attr, data_collection)
-    if section:
-        return str(section.get("mitigation", "") or "")
-    return ""
-
-
-def compute_top_risks(domain: str) -> dict[str, Any]:
+def compute_top_risks(domain: str, *, analysis_key: str | None = None) -> dict[str, Any]:
     """
     Compute the top-3 high-risk (red) attributes for *domain*, enriched with
     title, evidence, and explanation; add Data Retention Policy section; add
-    mitigations for the top 2 of those risks.
+    mitigations for the top 2 of those risks. Evidence comes from the analysis cached
+    under *analysis_key*, by default ``tos:process:<domain>``.
 
     Returns::
 
@@ -185,75 +212,47 @@ def compute_top_risks(domain: str) -> dict[str, Any]:
         }
     """
     normalized_domain = _normalize_domain(domain)
-    logger.info(
-        ">>> compute_top_risks called for domain=%s normalized=%s",
+    logger.debug(
+        "compute_top_risks called for domain=%s normalized=%s",
         domain,
         normalized_domain,
     )
 
-    # 1. All attributes sorted by sensitivity (highest first)
-    all_attrs = get_site_attributes(normalized_domain)
-    logger.info("All attributes for %s: %s", normalized_domain, all_attrs)
-
-    # 2. Keep only red (high risk); take first 3 with distinct section types (no duplicate categories)
-    red_attrs = [a for a in all_attrs if a.get("color") == "red"]
-    seen_section_types: set[str] = set()
-    top_3: list[dict[str, Any]] = []
-    for a in red_attrs:
-        attr_name = a.get("attribute")
-        if not attr_name:
-            continue
-        section_type = _attribute_section_type(attr_name)
-        if section_type in seen_section_types:
-            continue
-        seen_section_types.add(section_type)
-        top_3.append(a)
-        if len(top_3) >= 3:
-            break
-    logger.info("Top-3 high-risk (red) attributes for %s: %s", normalized_domain, top_3)
-
-    # 3. Cached TOS analysis (for evidence, explanation, retention, mitigation)
-    cache_key = _cache_key_for_domain(normalized_domain)
-    try:
-        cached = get_json(cache_key, PolicyAnalysis)
-    except Exception as e:
-        logger.warning("Cache lookup failed for %s: %s", cache_key, e)
-        cached = None
-
-    analysis_dict: dict[str, Any] = cached.model_dump() if cached else {}
+    # 1. Top-3 high-risk (red) attributes with distinct section types, highest
+    # sensitivity first (selected when the site was processed), plus the cached TOS
+    # analysis (for evidence, explanation, retention, mitigation), in one round-trip.
+    # Fields are read straight off the model; no full model_dump() per request.
+    top_3, cached = _load_overlay_inputs(normalized_domain, analysis_key)
+    logger.debug("Top-3 high-risk (red) attributes for %s: %s", normalized_domain, top_3)
 
-    # 4. Build enriched top-3: title (heading), evidence, explanation
+    # 2. Build enriched top-3 (title, evidence, explanation) and mitigations for the
+    # top 2, resolving each attribute's section once.
     enriched: list[dict[str, Any]] = []
-    for item in top_3:
+    mitigations: list[dict[str, Any]] = []
+    for index, item in enumerate(top_3):
         attr_name: str = item["attribute"]
-        evidence = _get_evidence_for_attribute(attr_name, analysis_dict)
-        explanation = _get_explanation_for_attribute(attr_name, analysis_dict)
+        title = _format_attribute_name(attr_name)
+        evidence, explanation, mitigation = _get_fields_for_attribute(attr_name, cached)
         enriched.append({
-            "title": _format_attribute_name(attr_name),
+            "title": title,
             "evidence": evidence,
             "explanation": explanation,
             "color": item["color"],
             "sensitivity_level": item["sensitivity_level"],
         })
-
-    # 5. Data Retention Policy: title + explanation from retention.retention_explanation
-    retention = analysis_dict.get("retention") or {}
-    retention_explanation = str(retention.get("retention_explanation") or "").strip()
+        if index < 2:
+            mitigations.append({
+                "title": title,
+                "mitigation": mitigation,
+            })
+
+    # 3. Data Retention Policy: title + explanation from retention.retention_explanation
+    retention_explanation = (cached.retention.retention_explanation or "").strip() if cached else ""
     data_retention_policy: dict[str, Any] = {
         "title": "Data Retention Policy",
         "explanation": retention_explanation,
     }
 
-    # 6. Mitigations for top 2 of the top-3 risks
-    mitigations: list[dict[str, Any]] = []
-    for item in top_3[:2]:
-        attr_name = item["attribute"]
-        mitigation = _get_mitigation_for_attribute(attr_name, analysis_dict)
-        mitigations.append({
-            "title": _format_attribute_name(attr_name),
-            "mitigation": mitigation,
-        })
-
     result: dict[str, Any] = {
         "domain": normalized_domain,
         "top_high_risk_attributes": enriched,
@@ -262,7 +261,7 @@ def compute_top_risks(domain: str) -> dict[str, Any]:
         "has_cached_analysis": cached is not None,
     }
 
-    logger.info(
+    logger.debug(
         "Overlay summary for %s — top 3 high-risk: %s; retention: %s; mitigations: %s",
         normalized_domain,
         enriched,
@@ -273,17 +272,55 @@ def compute_top_risks(domain: str) -> dict[str, Any]:
     return result
 
 
+def store_overlay_payload(domain: str, analysis_key: str | None = None) -> None:
+    """
+    Compute the overlay payload for *domain* and store its serialized JSON in Valkey.
+
+    Call after the domain's TOS analysis and attributes are written, so /top_risks can
+    serve the stored bytes without recomputing. Pass the key the analysis was just
+    written under as *analysis_key* when it is not the domain's own (a multi-domain
+    request caches one analysis under the combined key).
+    """
+    normalized_domain = _normalize_domain(domain)
+    payload = compute_top_risks(normalized_domain, analysis_key=analysis_key)
+    get_client().set(_overlay_key_for_domain(normalized_domain), dumps(payload))
+
+
+def _get_stored_overlay_payload(domain: str) -> bytes | None:
+    """Return the precomputed overlay JSON for *domain*, or None if missing or unreadable."""
+    key = _overlay_key_for_domain(domain)
+    try:
+        return get_client().get(key)
+    except Exception as e:
+        logger.warning("Precomputed overlay lookup failed for %s: %s", key, e)
+        return None
+
+
+def top_risks_json(domain: str) -> bytes:
+    """
+    Overlay summary for *domain* as JSON bytes: the payload precomputed when the domain
+    was processed if there is one, otherwise computed now (see compute_top_risks).
+    """
+    stored = _get_stored_overlay_payload(_normalize_domain(domain))
+    if stored is not None:
+        return stored
+    return dumps(compute_top_risks(domain))
+
+
 @router.get("/top_risks")
 def get_top_risks(
     domain: str = Query(..., description="Domain to look up, e.g. google.com"),
-) -> dict[str, Any]:
+) -> Response:
     """
     Return the top-3 high-risk (red) attributes with title, evidence, and
     explanation; a Data Retention Policy section with explanation; and
     mitigations for the top 2 of those risks.
+
+    Serves the payload precomputed when the domain was processed if there is one;
+    otherwise computes it live and serializes it with orjson.
     """
     try:
-        return compute_top_risks(domain)
+        return Response(content=top_risks_json(domain), media_type="application/json")
     except Exception as e:
         logger.error("Failed to compute top risks for %s: %s", domain, e)
         raise HTTPException(status_code=503, detail=str(e)) from e
@@ -1,16 +1,23 @@
 """Root / welcome endpoint."""
 
-from fastapi import APIRouter, Depends
+from functools import lru_cache
+
+from fastapi import APIRouter, Depends, Response
 
 from app.core.config import Settings, get_settings
+from app.core.responses import dumps
 from app.schemas.common import MessageResponse
 
 router = APIRouter(tags=["root"])
 
 
-@router.get("/", response_model=MessageResponse)
-def root(settings: Settings = Depends(get_settings)) -> MessageResponse:
+@lru_cache(maxsize=8)
+def _root_body(app_name: str) -> bytes:
+    """Serialized MessageResponse; settings are constant at runtime, so build it once."""
+    return dumps(MessageResponse(message=f"{app_name} is running. Use /docs for Swagger UI."))
+
+
+@router.get("/", responses={200: {"model": MessageResponse}})
+def root(settings: Settings = Depends(get_settings)) -> Response:
     """Welcome message and API info."""
-    return MessageResponse(
-        message=f"{settings.app_name} is running. Use /docs for Swagger UI."
-    )
+    return Response(content=_root_body(settings.app_name), media_type="application/json")
@@ -1,12 +1,13 @@
 """LangChain chain for TOS/Privacy Policy extraction using structured output."""
 
 import logging
+from functools import lru_cache
 
 from langchain_core.tools import StructuredTool
 from langchain_google_genai import ChatGoogleGenerativeAI
 
 from app.api.tos_processor.models import PolicyAnalysis
-from app.api.tos_processor.prompts import TOS_PRIVACY_EXTRACTION_PROMPT
+from app.api.tos_processor.prompts import render_prompt
 from app.core.config import get_settings
 
 logger = logging.getLogger(__name__)
@@ -25,34 +26,43 @@ def _format_policies(policy_texts: list[str]) -> str:
     return "\n\n".join(parts)
 
 
-def _extract_terms_and_privacy_risks(policy_texts: list[str]) -> dict:
-    """
-    Run the extraction prompt against the LLM with structured output enforcement.
-    Accepts one or more policy/document texts; the LLM extracts from all into one output.
-    Retries up to MAX_RETRIES times if the model returns None.
+@lru_cache(maxsize=4)
+def _structured_model(api_key: str):
     """
-    settings = get_settings()
-    if not settings.gemini_api_key:
-        raise ValueError("GEMINI_API_KEY is not set")
-
-    policies_block = _format_policies(policy_texts)
-    prompt = TOS_PRIVACY_EXTRACTION_PROMPT.format(policies=policies_block)
+    Gemini runnable bound to the PolicyAnalysis output schema, built once per API key.
 
+    with_structured_output() converts the whole PolicyAnalysis JSON schema into a tool
+    declaration (~20ms), so it is not rebuilt for every extraction.
+    """
     model = ChatGoogleGenerativeAI(
         model="gemini-2.5-pro",
-        google_api_key=settings.gemini_api_key,
+        google_api_key=api_key,
         temperature=0,
     )
+    return model.with_structured_output(PolicyAnalysis, include_raw=True)
 
-    structured_model = model.with_structured_output(PolicyAnalysis, include_raw=True)
+
+def _extract_policy_analysis(prompt: str) -> PolicyAnalysis:
+    """
+    Run a rendered extraction prompt (render_prompt / render_pages_prompt) against the
+    LLM with structured output enforcement; the LLM extracts from all documents in it
+    into one output. Retries up to MAX_RETRIES times if the model returns None.
+    """
+    settings = get_settings()
+    if not settings.gemini_api_key:
+        raise ValueError("GEMINI_API_KEY is not set")
+
+    structured_model = _structured_model(settings.gemini_api_key)
 
     for attempt in range(1, MAX_RETRIES + 1):
         logger.info("LLM extraction attempt %d/%d", attempt, MAX_RETRIES)
         response = structured_model.invoke(prompt)
         parsed = response.get("parsed") if isinstance(response, dict) else response
         if parsed is not None:
-            logger.info("Extraction result:\n%s", parsed.model_dump_json(indent=2))
-            return parsed.model_dump()
+            # Serializing the result is only worth it when someone reads it.
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Extraction result:\n%s", parsed.model_dump_json(indent=2))
+            return parsed
 
         # Log the parsing error so we can see why validation failed
         parsing_error = response.get("parsing_error") if isinstance(response, dict) else None
@@ -69,12 +79,18 @@ def _extract_terms_and_privacy_risks(policy_texts: list[str]) -> dict:
                 try:
                     fallback = PolicyAnalysis.model_validate(tool_call_args)
                     logger.info("Fallback parsing succeeded from tool_calls")
-                    return fallback.model_dump()
+                    return fallback
                 except Exception as e:
                     logger.warning("Fallback parsing also failed: %s", e)
 
     raise RuntimeError("LLM failed to return structured output after %d attempts" % MAX_RETRIES)
 
+
+def _extract_terms_and_privacy_risks(policy_texts: list[str]) -> dict:
+    """Tool entry point: extract from *policy_texts*, returned as a plain dict."""
+    prompt = render_prompt(_format_policies(policy_texts))
+    return _extract_policy_analysis(prompt).model_dump()
+
 extract_terms_and_privacy_risks_tool = StructuredTool.from_function(
     name="extract_terms_and_privacy_risks",
     description=(
@@ -1,6 +1,6 @@
 # """Pydantic models for TOS/Privacy Policy risk extraction output."""
-from typing import get_args, List, Literal, Optional
-from pydantic import BaseModel, Field, field_validator
+from typing import Any, ClassVar, get_args, List, Literal, Optional
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 
 # Data collection allowed values (Literal types for consistent model output)
 
@@ -69,92 +69,91 @@ SensitiveCategoryType = Literal[
 ]
 
 
-def _filter_types(values: list, allowed: frozenset) -> list:
-    """Keep only values in allowed set; ignore extras from LLM."""
-    if not isinstance(values, list):
-        return values
-    return [x for x in values if x in allowed]
+SectionField = Literal["evidence", "explanation", "mitigation"]
 
 
-class PersonalIdentifiersCollected(BaseModel):
-    """PII types the policy says are collected. Only use values from PIIType."""
-    types: List[PIIType] = Field(default_factory=list, description="PII types collected")
+class _FrozenModel(BaseModel):
+    """
+    Immutable base for analysis models: cached/parsed analyses are shared, never edited.
 
-    @field_validator("types", mode="before")
-    @classmethod
-    def filter_types(cls, v: object) -> list:
-        return _filter_types(v if isinstance(v, list) else [], frozenset(get_args(PIIType)))
-    evidence: str = Field("", description="Quoted evidence from the document")
-    explanation: str = Field("", description="Why this matters for privacy; max 15 words for popup readability")
-    mitigation: str = Field("", description="Practical steps to limit exposure; max 15 words for popup readability")
+    Nested instances are reused as-is when validating (Pydantic v2 default,
+    ``revalidate_instances="never"``), so no per-validation copies are made.
+    """
 
+    model_config = ConfigDict(frozen=True, revalidate_instances="never")
 
-class DeviceDataCollected(BaseModel):
-    """Device/technical data types collected. Only use values from DeviceDataType."""
-    types: List[DeviceDataType] = Field(default_factory=list, description="Device data types collected")
 
-    @field_validator("types", mode="before")
-    @classmethod
-    def filter_types(cls, v: object) -> list:
-        return _filter_types(v if isinstance(v, list) else [], frozenset(get_args(DeviceDataType)))
-    evidence: str = Field("", description="Quoted evidence from the document")
-    explanation: str = Field("", description="Why this matters for privacy; max 15 words for popup readability")
-    mitigation: str = Field("", description="Practical steps to limit exposure; max 15 words for popup readability")
+class _SectionFieldsMixin:
+    """Read access to the user-facing text fields shared by data collection sections."""
 
+    def get_field(self, name: SectionField) -> str:
+        """Return the evidence/explanation/mitigation text, or "" when empty."""
+        return getattr(self, name) or ""
 
-class LocationDataCollected(BaseModel):
-    """Location data types collected. Only use values from LocationType."""
-    types: List[LocationType] = Field(default_factory=list, description="Location data types collected")
 
-    @field_validator("types", mode="before")
-    @classmethod
-    def filter_types(cls, v: object) -> list:
-        return _filter_types(v if isinstance(v, list) else [], frozenset(get_args(LocationType)))
-    evidence: str = Field("", description="Quoted evidence from the document")
-    explanation: str = Field("", description="Why this matters for privacy; max 15 words for popup readability")
-    mitigation: str = Field("", description="Practical steps to limit exposure; max 15 words for popup readability")
+class _CollectedSection(_SectionFieldsMixin, _FrozenModel):
+    """
+    Fields shared by the data collection sections with a ``types`` list.
 
+    Subclasses redeclare ``types`` with their Literal item type; values outside it are
+    dropped rather than failing validation (the LLM occasionally invents extras).
+    """
 
-class UserContentCollected(BaseModel):
-    """User-generated content types collected. Only use values from UserContentType."""
-    types: List[UserContentType] = Field(default_factory=list, description="User content types collected")
+    _allowed_types: ClassVar[frozenset[str]] = frozenset()
 
-    @field_validator("types", mode="before")
-    @classmethod
-    def filter_types(cls, v: object) -> list:
-        return _filter_types(v if isinstance(v, list) else [], frozenset(get_args(UserContentType)))
+    types: tuple[str, ...] = ()
     evidence: str = Field("", description="Quoted evidence from the document")
     explanation: str = Field("", description="Why this matters for privacy; max 15 words for popup readability")
     mitigation: str = Field("", description="Practical steps to limit exposure; max 15 words for popup readability")
 
-
-class ThirdPartyDataCollected(BaseModel):
-    """Third-party source types from which data is obtained. Only use values from ThirdPartySourceType."""
-    types: List[ThirdPartySourceType] = Field(default_factory=list, description="Third-party source types")
+    @classmethod
+    def __pydantic_init_subclass__(cls, **kwargs: Any) -> None:
+        super().__pydantic_init_subclass__(**kwargs)
+        # tuple[Literal[...], ...] -> the Literal's values, built once per class.
+        item_type = get_args(cls.model_fields["types"].annotation)[0]
+        cls._allowed_types = frozenset(get_args(item_type))
 
     @field_validator("types", mode="before")
     @classmethod
-    def filter_types(cls, v: object) -> list:
-        return _filter_types(v if isinstance(v, list) else [], frozenset(get_args(ThirdPartySourceType)))
-    evidence: str = Field("", description="Quoted evidence from the document")
-    explanation: str = Field("", description="Why this matters for privacy; max 15 words for popup readability")
-    mitigation: str = Field("", description="Practical steps to limit exposure; max 15 words for popup readability")
+    def filter_types(cls, v: object) -> tuple:
+        """Keep only values in the allowed set; ignore extras from LLM."""
+        if not isinstance(v, (list, tuple)) or not v:
+            return ()
+        allowed = cls._allowed_types
+        return tuple(x for x in v if x in allowed)
 
 
-class SensitiveDataCollected(BaseModel):
-    """Sensitive/special category data. Only use values from SensitiveCategoryType."""
-    types: List[SensitiveCategoryType] = Field(default_factory=list, description="Sensitive categories collected")
+class PersonalIdentifiersCollected(_CollectedSection):
+    """PII types the policy says are collected. Only use values from PIIType."""
+    types: tuple[PIIType, ...] = Field(default_factory=tuple, description="PII types collected")
+
+
+class DeviceDataCollected(_CollectedSection):
+    """Device/technical data types collected. Only use values from DeviceDataType."""
+    types: tuple[DeviceDataType, ...] = Field(default_factory=tuple, description="Device data types collected")
 
-    @field_validator("types", mode="before")
-    @classmethod
-    def filter_types(cls, v: object) -> list:
-        return _filter_types(v if isinstance(v, list) else [], frozenset(get_args(SensitiveCategoryType)))
-    evidence: str = Field("", description="Quoted evidence from the document")
-    explanation: str = Field("", description="Why this matters for privacy; max 15 words for popup readability")
-    mitigation: str = Field("", description="Practical steps to limit exposure; max 15 words for popup readability")
 
+class LocationDataCollected(_CollectedSection):
+    """Location data types collected. Only use values from LocationType."""
+    types: tuple[LocationType, ...] = Field(default_factory=tuple, description="Location data types collected")
 
-class Signal(BaseModel):
+
+class UserContentCollected(_CollectedSection):
+    """User-generated content types collected. Only use values from UserContentType."""
+    types: tuple[UserContentType, ...] = Field(default_factory=tuple, description="User content types collected")
+
+
+class ThirdPartyDataCollected(_CollectedSection):
+    """Third-party source types from which data is obtained. Only use values from ThirdPartySourceType."""
+    types: tuple[ThirdPartySourceType, ...] = Field(default_factory=tuple, description="Third-party source types")
+
+
+class SensitiveDataCollected(_CollectedSection):
+    """Sensitive/special category data. Only use values from SensitiveCategoryType."""
+    types: tuple[SensitiveCategoryType, ...] = Field(default_factory=tuple, description="Sensitive categories collected")
+
+
+class Signal(_SectionFieldsMixin, _FrozenModel):
     """A single extracted signal: found/not_found/unknown + evidence quote."""
     status: str = Field(..., description="One of: true, false, not_found, unknown")
     evidence: str = Field("", description="Direct quoted language from the document, or empty")
@@ -162,12 +161,12 @@ class Signal(BaseModel):
     mitigation: str = Field("", description="Max 15 words when used in data collection; optional elsewhere")
 
 
-class RedFlag(BaseModel):
+class RedFlag(_FrozenModel):
     clause: str = Field(..., description="The problematic clause text")
     severity: str = Field(..., description="One of: low, medium, high")
     explanation: str = Field(..., description="Why this is a red flag; max 15 words for popup readability")
 
-class CrawlMetadata(BaseModel):
+class CrawlMetadata(_FrozenModel):
     domain: str
     site_name: Optional[str] = None
     policy_url: Optional[str] = None
@@ -175,7 +174,7 @@ class CrawlMetadata(BaseModel):
     policy_last_updated: Optional[str] = None
 
 
-class DataCollectionSection(BaseModel):
+class DataCollectionSection(_FrozenModel):
     """Data collection signals. Use only the allowed Literal values in each types array."""
     personal_identifiers: PersonalIdentifiersCollected
     ip_address: Signal
@@ -185,8 +184,11 @@ class DataCollectionSection(BaseModel):
     third_party_data: ThirdPartyDataCollected
     sensitive_data: SensitiveDataCollected
 
+# Section names, read once: model_fields is a computed class property (~0.5us per access).
+_DATA_COLLECTION_SECTION_KEYS = frozenset(DataCollectionSection.model_fields)
+
 
-class DataUsageSection(BaseModel):
+class DataUsageSection(_FrozenModel):
     model_training: Signal
     advertising: Signal
     data_sale: Signal
@@ -194,7 +196,7 @@ class DataUsageSection(BaseModel):
     anonymization_claimed: Signal
 
 
-class UserRightsSection(BaseModel):
+class UserRightsSection(_FrozenModel):
     access: Signal
     correction: Signal
     deletion: Signal
@@ -203,7 +205,7 @@ class UserRightsSection(BaseModel):
     opt_out_training: Signal
 
 
-class RetentionSection(BaseModel):
+class RetentionSection(_FrozenModel):
     """Retention signals. retention_explanation is overlay-ready: implications, vagueness, what users can do."""
     retention_duration: str = Field(..., description="Normalized: indefinite, P2Y, case_by_case, unknown, etc.")
     retention_explanation: str = Field(
@@ -214,7 +216,7 @@ class RetentionSection(BaseModel):
     vague_retention_language: Signal
 
 
-class LegalTermsSection(BaseModel):
+class LegalTermsSection(_FrozenModel):
     liability_cap: Signal
     indemnification: Signal
     mandatory_arbitration: Signal
@@ -224,7 +226,7 @@ class LegalTermsSection(BaseModel):
     perpetual_license: Signal
 
 
-class ScoreSection(BaseModel):
+class ScoreSection(_FrozenModel):
     privacy_score: float = Field(..., description="Overall privacy score 0-100")
     posture: str = Field(..., description="One of: low_risk, moderate_risk, high_risk, unknown")
     posture_explanation: str = Field(
@@ -237,7 +239,7 @@ class ScoreSection(BaseModel):
     user_control: float = Field(..., description="Score 0-100")
 
 
-class PolicyAnalysis(BaseModel):
+class PolicyAnalysis(_FrozenModel):
     metadata: CrawlMetadata
     data_collection: DataCollectionSection
     data_usage: DataUsageSection
@@ -245,4 +247,10 @@ class PolicyAnalysis(BaseModel):
     retention: RetentionSection
     legal_terms: LegalTermsSection
     red_flags: List[RedFlag]
-    scores: ScoreSection
\ No newline at end of file
+    scores: ScoreSection
+
+    def get_section(self, section_key: str) -> _SectionFieldsMixin | None:
+        """Return the data_collection section named *section_key*, or None if there is none."""
+        if section_key not in _DATA_COLLECTION_SECTION_KEYS:
+            return None
+        return getattr(self.data_collection, section_key)
\ No newline at end of file
@@ -0,0 +1,54 @@
+"""msgspec views of cached PolicyAnalysis JSON for read-only hot paths.
+
+These decode only the fields a reader needs and skip everything else, which is much
+cheaper than validating the whole ``PolicyAnalysis`` tree. They are not a substitute for
+the Pydantic models: data is validated with ``PolicyAnalysis`` before it is cached.
+"""
+
+from typing import Literal
+
+import msgspec
+
+SectionField = Literal["evidence", "explanation", "mitigation"]
+
+
+class SectionView(msgspec.Struct, frozen=True):
+    """User-facing text of a data collection section (``*Collected`` or ``Signal``)."""
+
+    evidence: str = ""
+    explanation: str = ""
+    mitigation: str = ""
+
+    def get_field(self, name: SectionField) -> str:
+        """Return the evidence/explanation/mitigation text, or "" when empty."""
+        return getattr(self, name) or ""
+
+
+class DataCollectionView(msgspec.Struct, frozen=True):
+    personal_identifiers: SectionView
+    ip_address: SectionView
+    precise_location: SectionView
+    device_fingerprinting: SectionView
+    user_content: SectionView
+    third_party_data: SectionView
+    sensitive_data: SectionView
+
+
+class RetentionView(msgspec.Struct, frozen=True):
+    retention_explanation: str = ""
+
+
+class OverlayAnalysis(msgspec.Struct, frozen=True):
+    """The parts of a cached ``PolicyAnalysis`` read by the overlay summary."""
+
+    data_collection: DataCollectionView
+    retention: RetentionView
+
+    def get_section(self, section_key: str) -> SectionView | None:
+        """Return the data_collection section named *section_key*, or None if there is none."""
+        if section_key not in DataCollectionView.__struct_fields__:
+            return None
+        return getattr(self.data_collection, section_key)
+
+
+OVERLAY_ANALYSIS_DECODER = msgspec.json.Decoder(OverlayAnalysis)
@@ -1,6 +1,25 @@
 # """Prompt for processing Privacy Policy and Terms of Service."""
 
-TOS_PRIVACY_EXTRACTION_PROMPT = """
+from collections.abc import Iterator, Mapping
+from typing import get_args
+
+from app.api.tos_processor.models import DataCollectionSection
+
+
+def _allowed_types_block() -> str:
+    """Bulleted allowed values per data_collection "types" array, taken from the model Literals."""
+    lines = []
+    for key, field in DataCollectionSection.model_fields.items():
+        section_fields = getattr(field.annotation, "model_fields", {})
+        if "types" not in section_fields:
+            continue
+        # tuple[Literal[...], ...] -> the Literal's values, in declaration order.
+        item_type = get_args(section_fields["types"].annotation)[0]
+        lines.append(f"• {key}.types: {', '.join(get_args(item_type))}")
+    return "\n".join(lines)
+
+
+_TOS_PRIVACY_EXTRACTION_TEMPLATE = """
 You are a privacy risk analyst and technology lawyer.
 
 Your task is to extract structured legal and privacy risk signals from one or more Privacy Policy and/or Terms of Service documents.
@@ -57,12 +76,7 @@ Explicitly detect:
 • opt_out_training
 
 For data collection, every field (including ip_address) must include "explanation" (why this matters for privacy) and "mitigation" (practical steps users can take to limit exposure, e.g. deny permissions, use VPN, opt out, limit shared data). Use ONLY these allowed values in each "types" array (no other values):
-• personal_identifiers.types: name, email, phone_number, physical_address, date_of_birth, government_id, financial_account, biometric, photo, gender, nationality, race_ethnicity, ip_address
-• precise_location.types: precise_gps, coarse_location, wifi_cell, ip_derived
-• device_fingerprinting.types: device_id, browser_info, os, screen_resolution, language, timezone, fingerprint, ip_address
-• user_content.types: posts, messages, photos, videos, search_history, purchase_history, contacts
-• third_party_data.types: social_media, advertisers, analytics, data_brokers, affiliates
-• sensitive_data.types: health, biometric, genetic, political, religious, sexual_orientation, union_membership, criminal
+{allowed_types}
 
 For each data collection category include "evidence" (short quoted excerpt), "explanation" (why this matters for privacy, max 15 words), and "mitigation" (practical steps to reduce risk, max 15 words). Use empty list [] for types when not mentioned.
 
@@ -83,4 +97,45 @@ For the scores section, include "posture_explanation" in at most 15 words: why t
 The policies are below:
 
 {policies}
-"""
\ No newline at end of file
+"""
+
+# The allowed-values list is generated so it cannot drift from the models; the result is
+# still a str.format template with a single {policies} field.
+TOS_PRIVACY_EXTRACTION_PROMPT = _TOS_PRIVACY_EXTRACTION_TEMPLATE.replace(
+    "{allowed_types}", _allowed_types_block()
+)
+
+# Split once at import so rendering is a plain concatenation instead of a str.format pass
+# over the whole template (whose JSON example braces are escaped as {{ }}).
+_PROMPT_PREFIX, _, _PROMPT_SUFFIX = (
+    TOS_PRIVACY_EXTRACTION_PROMPT.replace("{{", "{").replace("}}", "}").partition("{policies}")
+)
+
+
+def render_prompt(policies: str) -> str:
+    """Return TOS_PRIVACY_EXTRACTION_PROMPT with *policies* substituted (same as .format)."""
+    return _PROMPT_PREFIX + policies + _PROMPT_SUFFIX
+
+
+def _page_parts(pages: Mapping[str, str]) -> Iterator[str]:
+    for i, (url, text) in enumerate(pages.items(), start=1):
+        if i > 1:
+            yield "\n\n"
+        yield f"--- Document {i} ---\nSource: "
+        yield url
+        if text:
+            yield "\n\n"
+            yield text
+
+
+def render_pages_prompt(pages: Mapping[str, str]) -> str:
+    """
+    Return the extraction prompt for url -> page text, each page labelled
+    "--- Document N ---" and headed "Source: <url>" (the chain's _format_policies layout).
+
+    Page texts can be megabytes, so the prompt is assembled with a single join instead
+    of per-page f-strings, a joined block, and a final concatenation.
+    """
+    if not pages:
+        return render_prompt("(No documents provided.)")
+    return "".join((_PROMPT_PREFIX, *_page_parts(pages), _PROMPT_SUFFIX))
@@ -1,38 +1,83 @@
 """TOS processor routes."""
 
 import asyncio
+import hashlib
 import logging
-from typing import Any
 
-from fastapi import APIRouter, Body, HTTPException, Query
+import msgspec
+import orjson
+from fastapi import APIRouter, Body, HTTPException, Query, Response
 from fastapi.responses import JSONResponse
 
-from app.api.tos_processor.chain import _extract_terms_and_privacy_risks
+from app.api.tos_processor.chain import _extract_policy_analysis
 from app.api.tos_processor.models import PolicyAnalysis
-from app.queries import get_json, set_json
-from app.severity_store import collect_attributes_from_data_collection, set_site_attributes
-from app.utils.fetch_page import fetch_page_content
+from app.api.tos_processor.models_fast import OVERLAY_ANALYSIS_DECODER
+from app.api.tos_processor.prompts import render_pages_prompt
+from app.core.config import get_settings
+from app.core.responses import dumps
+from app.db import get_client
+from app.queries import (
+    acquire_lock,
+    get_json,
+    get_json_raw,
+    get_json_raw_many,
+    release_lock,
+    set_json,
+)
+from app.severity_store import (
+    collect_attributes_from_data_collection,
+    get_attribute_severity_map,
+    set_site_attributes_many,
+)
+from app.utils.fetch_page import fetch_pages_content
 from app.utils.url_utils import get_domain
 
 router = APIRouter(prefix="/tos_processor", tags=["tos_processor"])
 logger = logging.getLogger(__name__)
 
 TOS_CACHE_PREFIX = "tos:process:"
+# Content-addressed copy of each analysis, keyed by a hash of the domains and fetched
+# policy texts; expires after settings.tos_content_cache_ttl_seconds.
+TOS_CONTENT_CACHE_PREFIX = "tos:content:"
+
+# Last fetched url -> text, for GET /; shared by all workers and expires on its own.
+TOS_PAGES_KEY = "tos:pages:last"
+TOS_PAGES_TTL_SECONDS = 3600
+# Per-page cap on stored text so one huge policy cannot pin megabytes in Valkey.
+MAX_STORED_PAGE_CHARS = 200_000
+
+# In-flight cache keys to avoid redundant processing for the same domain(s) in this
+# process; the Valkey lock (_lock_key) does the same across workers.
+_processing_cache_keys: set[str] = set()
 
-# In-memory store for the last POST result; GET returns this.
-_fetched_pages: dict[str, str] = {}
 
-# In-flight cache keys to avoid redundant processing for the same domain(s).
-_processing_cache_keys: set[str] = set()
+def _domains_for_urls(urls: list[str]) -> list[str]:
+    """Sorted, de-duplicated registered domains of *urls* (blank URLs are skipped)."""
+    return sorted({get_domain(u) for u in urls if u.strip()})
 
 
-def _cache_key_for_urls(urls: list[str]) -> str:
-    """Cache key from domain name(s) extracted from the URLs."""
-    domains = sorted({get_domain(u) for u in urls if u.strip()})
+def _cache_key_for_domains(domains: list[str]) -> str:
+    """Cache key from sorted domain name(s), as returned by _domains_for_urls."""
     key = "|".join(domains) if domains else "no_domain"
     return f"{TOS_CACHE_PREFIX}{key}"
 
 
+def _content_key_for_pages(domains: list[str], texts: list[str]) -> str | None:
+    """
+    Cache key from the registered domains and fetched policy texts (in any order), so an
+    analysis, whose metadata names its domain, is only reused for the same site. None
+    when every text is blank: failed fetches must not share one analysis.
+    """
+    if not any(text.strip() for text in texts):
+        return None
+    digest = hashlib.blake2b(_cache_key_for_domains(domains).encode("utf-8"), digest_size=16)
+    digest.update(b"\0")
+    for text in sorted(texts):
+        digest.update(text.encode("utf-8"))
+        digest.update(b"\0")
+    return f"{TOS_CONTENT_CACHE_PREFIX}{digest.hexdigest()}"
+
+
 def _normalize_domain_input(raw_domain: str) -> str:
     """Normalize host/subdomain input to a registered root domain."""
     candidate = raw_domain.strip()
@@ -44,64 +89,222 @@ def _normalize_domain_input(raw_domain: str) -> str:
     return normalized or raw_domain.strip().lower()
 
 
-def _policies_with_headings(pages: dict[str, str]) -> list[str]:
-    """Format url -> text as list of strings: each item is heading (URL) followed by content."""
-    return [f"Source: {url}\n\n{text.strip()}" for url, text in pages.items()]
+def _store_fetched_pages(pages: dict[str, str]) -> None:
+    """Keep the last fetched pages for GET /. Blocking (Valkey I/O): call from a worker thread."""
+    try:
+        set_json(
+            TOS_PAGES_KEY,
+            {url: text[:MAX_STORED_PAGE_CHARS] for url, text in pages.items()},
+            ttl_seconds=TOS_PAGES_TTL_SECONDS,
+        )
+    except Exception as e:
+        logger.warning("Failed to store fetched pages: %s", e)
+
+
+def _is_cached_analysis(key: str, raw: bytes) -> bool:
+    """
+    Whether *raw* holds an analysis JSON object that can be spliced into (see
+    _enrich_with_top_risks). /kv can write any value under tos:process:*, so a legacy or
+    corrupt one is logged and treated as a miss. Only the overlay fields are decoded.
+    """
+    try:
+        OVERLAY_ANALYSIS_DECODER.decode(raw)
+    except msgspec.DecodeError as e:
+        logger.warning("Cached analysis under %s is invalid: %s", key, e)
+        return False
+    return True
+
 
+def _enrich_with_top_risks(raw: bytes, domains: list[str]) -> bytes:
+    """
+    Attach overlay-summary top-risk data to a cached analysis (JSON object bytes,
+    checked with _is_cached_analysis).
 
-def _enrich_with_top_risks(payload: dict, urls: list[str]) -> dict:
-    """Attach overlay-summary top-risk data to a cached analysis payload."""
+    Both parts are already serialized, so the overlay JSON is spliced in as the last
+    member instead of decoding and re-encoding the analysis.
+    """
     # Lazy import to avoid circular dependency (overlay_summary → tos_processor.models)
-    from app.api.overlay_summary import compute_top_risks
+    from app.api.overlay_summary import top_risks_json
 
-    domains = sorted({get_domain(u) for u in urls if u.strip()})
     if not domains:
-        return payload
+        return raw
     # Use the first domain for the overlay summary lookup
     domain = domains[0]
     try:
-        top_risks = compute_top_risks(domain)
-        payload["overlay_summary"] = top_risks
-        logger.info("Enriched payload with overlay summary: %s", top_risks)
+        top_risks = top_risks_json(domain)
     except Exception as e:
         logger.warning("Failed to compute top risks for %s: %s", domain, e)
-    return payload
+        return raw
+    return b"".join((raw.rstrip()[:-1], b',"overlay_summary":', top_risks, b"}"))
 
 
-async def _run_process_and_cache(urls: list[str]) -> None:
-    """Fetch pages, run extraction, and store result in Valkey. Runs in background."""
+def _get_cached_payload(cache_key: str, domains: list[str]) -> bytes | None:
+    """
+    Return the cached analysis JSON under *cache_key* enriched with top risks, or None
+    on a miss or lookup failure. Blocking (Valkey I/O): call from a worker thread.
+    """
     try:
-        result: dict[str, str] = {}
-        for u in urls:
-            try:
-                text = await fetch_page_content(u)
-                result[u] = text
-            except Exception as e:
-                logger.exception("Failed to fetch %s: %s", u, e)
-                return
-        policies = _policies_with_headings(result)
-        extraction = await asyncio.to_thread(_extract_terms_and_privacy_risks, policies)
-        cache_key = _cache_key_for_urls(urls)
-        set_json(cache_key, extraction)
-        logger.info("Cached TOS analysis for %d URLs under key %s", len(urls), cache_key)
-
-        # Store per-domain attributes sorted by severity in Valkey (ZSET)
-        data_collection = extraction.get("data_collection", {})
-        found_attrs = collect_attributes_from_data_collection(data_collection)
-        domains = {get_domain(u) for u in urls if u.strip()}
-        for domain in domains:
-            set_site_attributes(domain, found_attrs)
-        logger.info("Stored %d attributes for %d domain(s)", len(found_attrs), len(domains))
+        raw = get_json_raw(cache_key)
+    except Exception as e:
+        logger.warning("Cache lookup failed: %s", e)
+        return None
+    if raw is None or not _is_cached_analysis(cache_key, raw):
+        return None
+    return _enrich_with_top_risks(raw, domains)
+
+
+def _get_analysis_for_content(content_key: str) -> PolicyAnalysis | None:
+    """
+    Return the analysis already extracted from identical policy text, or None.
+    Blocking (Valkey I/O): call from a worker thread.
+    """
+    try:
+        return get_json(content_key, PolicyAnalysis)
+    except Exception as e:
+        logger.warning("Content cache lookup failed for %s: %s", content_key, e)
+        return None
+
+
+def _store_analysis(
+    domains: list[str], analysis: PolicyAnalysis, content_key: str | None = None
+) -> None:
+    """
+    Cache *analysis* (also under *content_key* when given) and write each domain's
+    attribute ZSETs and overlay payload. Blocking (Valkey I/O): call from a worker thread.
+    """
+    # Lazy import to avoid circular dependency (overlay_summary → tos_processor.models)
+    from app.api.overlay_summary import invalidate_cached_analysis, store_overlay_payload
+
+    cache_key = _cache_key_for_domains(domains)
+    # Serialized straight from the model by pydantic-core (no model_dump + json.dumps).
+    set_json(cache_key, analysis)
+    if content_key is not None:
+        set_json(
+            content_key, analysis, ttl_seconds=get_settings().tos_content_cache_ttl_seconds
+        )
+    logger.info("Cached TOS analysis under key %s", cache_key)
+
+    # Store per-domain attributes sorted by severity in Valkey (ZSET)
+    data_collection = analysis.data_collection.model_dump()
+    found_attrs = collect_attributes_from_data_collection(data_collection)
+    # Read past the in-process memo: the ZSETs outlive it, and another worker may have
+    # re-seeded the map since it was filled.
+    set_site_attributes_many(domains, found_attrs, get_attribute_severity_map(use_cache=False))
+    for domain in domains:
+        try:
+            invalidate_cached_analysis(domain)
+            store_overlay_payload(domain, cache_key)
+        except Exception as e:
+            logger.warning("Failed to precompute overlay summary for %s: %s", domain, e)
+    logger.info("Stored %d attributes for %d domain(s)", len(found_attrs), len(domains))
+
+
+def _lock_key(cache_key: str) -> str:
+    return f"{cache_key}:lock"
+
+
+def _acquire_processing_lock(cache_key: str) -> str | None:
+    """
+    Claim the background extraction for *cache_key* across workers (SET NX EX).
+    Returns the lock token, or None if another worker holds the lock. If Valkey is
+    unreachable, falls back to the in-process dedup only and returns "" (no lock held).
+    Blocking (Valkey I/O): call from a worker thread.
+    """
+    try:
+        return acquire_lock(_lock_key(cache_key), get_settings().tos_process_lock_ttl_seconds)
+    except Exception as e:
+        logger.warning(
+            "Failed to take processing lock for %s; proceeding without cross-worker dedup: %s",
+            cache_key,
+            e,
+        )
+        return ""
+
+
+def _release_processing_lock(cache_key: str, token: str) -> None:
+    """Release the lock taken by _acquire_processing_lock with *token*. Blocking (Valkey I/O)."""
+    if not token:
+        return
+    try:
+        if not release_lock(_lock_key(cache_key), token):
+            logger.warning(
+                "Processing lock for %s expired before the extraction finished", cache_key
+            )
+    except Exception as e:
+        logger.warning("Failed to release processing lock for %s: %s", cache_key, e)
+
+
+def _processing_response() -> JSONResponse:
+    return JSONResponse(
+        status_code=202,
+        content={
+            "status": "processing",
+            "message": "Analysis started in background. Call this endpoint again with the same URLs to retrieve the result.",
+        },
+    )
+
+
+async def _start_processing(cache_key: str, urls: list[str]) -> None:
+    """Start the background extraction for *urls* unless one is already running."""
+    if cache_key in _processing_cache_keys:
+        logger.info("Skipping redundant process request for cache_key=%s", cache_key)
+        return
+    _processing_cache_keys.add(cache_key)
+    lock_token = await asyncio.to_thread(_acquire_processing_lock, cache_key)
+    if lock_token is None:
+        _processing_cache_keys.discard(cache_key)
+        logger.info("Extraction for cache_key=%s is running on another worker", cache_key)
+        return
+    asyncio.create_task(_run_process_and_cache(urls, lock_token))
+
+
+async def _run_process_and_cache(urls: list[str], lock_token: str = "") -> None:
+    """
+    Fetch pages, run extraction, and store result in Valkey. Runs in background.
+    Releases the processing lock held with *lock_token* ("" when none is held).
+    """
+    domains = _domains_for_urls(urls)
+    cache_key = _cache_key_for_domains(domains)
+    try:
+        try:
+            texts = await fetch_pages_content(urls)
+        except Exception as e:
+            logger.exception("Failed to fetch %s: %s", urls, e)
+            return
+        result: dict[str, str] = dict(zip(urls, texts))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Fetched pages: %s", {u: len(t) for u, t in result.items()})
+        await asyncio.to_thread(_store_fetched_pages, result)
+        # Unchanged policy text on the same site (e.g. a re-crawl) reuses the earlier
+        # analysis instead of another LLM call.
+        content_key = _content_key_for_pages(domains, texts)
+        analysis = None
+        if content_key is not None:
+            analysis = await asyncio.to_thread(_get_analysis_for_content, content_key)
+        if analysis is None:
+            prompt = render_pages_prompt(result)
+            analysis = await asyncio.to_thread(_extract_policy_analysis, prompt)
+        else:
+            logger.info("Reusing TOS analysis for unchanged policy text (%s)", content_key)
+        await asyncio.to_thread(_store_analysis, domains, analysis, content_key)
     except Exception as e:
         logger.exception("Background TOS process failed: %s", e)
     finally:
-        _processing_cache_keys.discard(_cache_key_for_urls(urls))
+        await asyncio.to_thread(_release_processing_lock, cache_key, lock_token)
+        _processing_cache_keys.discard(cache_key)
 
 
-@router.get("/")
-def tos_processor_get() -> dict[str, str]:
-    """Return the dictionary of url -> page text from the last successful POST."""
-    return _fetched_pages
+@router.get("/", responses={200: {"model": dict[str, str]}})
+def tos_processor_get() -> Response:
+    """
+    Return the dictionary of url -> page text from the last background fetch (kept for
+    an hour; texts are truncated to MAX_STORED_PAGE_CHARS). Empty if nothing was fetched.
+    """
+    try:
+        raw = get_client().get(TOS_PAGES_KEY)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=str(e)) from e
+    return Response(raw or b"{}", media_type="application/json")
 
 
 @router.get("/cached")
@@ -110,11 +313,14 @@ def tos_processor_get_cached_by_domain(
         ...,
         description="Domain(s) to look up in cache; accepts hostnames or URLs",
     )
-) -> dict[str, Any]:
+) -> Response:
     """
     Return cached analyses for the provided domains only.
-    This checks Valkey keys using the pattern: ``tos:process:<domain>`` and
-    does not trigger background processing for cache misses.
+    This checks Valkey keys using the pattern: ``tos:process:<domain>`` (one MGET for all
+    domains) and does not trigger background processing for cache misses.
+
+    The stored analysis bytes are embedded as is, without re-serializing; values that
+    do not decode as an analysis (see _is_cached_analysis) are reported as missing.
     """
     normalized_domains = sorted({
         normalized
@@ -124,39 +330,40 @@ def tos_processor_get_cached_by_domain(
     if not normalized_domains:
         raise HTTPException(status_code=400, detail="At least one domain is required")
 
-    matched: dict[str, dict[str, Any]] = {}
+    # Cached analyses are embedded as pre-serialized JSON (orjson.Fragment).
+    matched: dict[str, orjson.Fragment] = {}
     missing: list[str] = []
 
-    for d in normalized_domains:
-        key = f"{TOS_CACHE_PREFIX}{d}"
-        try:
-            cached = get_json(key, PolicyAnalysis)
-        except Exception as e:
-            logger.warning("Cache lookup failed for %s: %s", key, e)
-            cached = None
+    keys = [f"{TOS_CACHE_PREFIX}{d}" for d in normalized_domains]
+    try:
+        cached_analyses = get_json_raw_many(keys)
+    except Exception as e:
+        logger.warning("Cache lookup failed for %s: %s", keys, e)
+        cached_analyses = [None] * len(keys)
 
-        if cached is None:
+    for d, key, raw in zip(normalized_domains, keys, cached_analyses):
+        if raw is None or not _is_cached_analysis(key, raw):
             missing.append(d)
             continue
-
-        payload = cached.model_dump()
-        payload = _enrich_with_top_risks(payload, [f"https://{d}"])
-        matched[d] = payload
-
-    return {
-        "prefix": TOS_CACHE_PREFIX,
-        "requested_count": len(normalized_domains),
-        "matched_count": len(matched),
-        "missing_count": len(missing),
-        "matched": matched,
-        "missing": missing,
-    }
+        matched[d] = orjson.Fragment(_enrich_with_top_risks(raw, [d]))
+
+    return Response(
+        content=dumps({
+            "prefix": TOS_CACHE_PREFIX,
+            "requested_count": len(normalized_domains),
+            "matched_count": len(matched),
+            "missing_count": len(missing),
+            "matched": matched,
+            "missing": missing,
+        }),
+        media_type="application/json",
+    )
 
 
-@router.get("/process")
+@router.get("/process", responses={200: {"model": PolicyAnalysis}})
 async def tos_processor_get_process(
     url: list[str] = Query(..., description="URLs to fetch and analyze")
-) -> dict:
+) -> Response:
     """
     Return cached analysis if available. Otherwise start processing in the background
     and return 202; call again with the same URLs to get the result once ready.
@@ -164,81 +371,33 @@ async def tos_processor_get_process(
     urls = list(url)
     if not urls:
         raise HTTPException(status_code=400, detail="At least one url is required")
-    cache_key = _cache_key_for_urls(urls)
-    try:
-        cached = get_json(cache_key, PolicyAnalysis)
-    except Exception as e:
-        logger.warning("Cache lookup failed: %s", e)
-        cached = None
-    if cached is not None:
-        payload = cached.model_dump()
-        payload = _enrich_with_top_risks(payload, urls)
-        logger.info(
-            "Returning TOS analysis for overlay (cache_key=%s): %s",
-            cache_key,
-            payload,
-        )
-        return payload
-    if cache_key in _processing_cache_keys:
-        logger.info("Skipping redundant process request for cache_key=%s", cache_key)
-        return JSONResponse(
-            status_code=202,
-            content={
-                "status": "processing",
-                "message": "Analysis started in background. Call this endpoint again with the same URLs to retrieve the result.",
-            },
-        )
-    _processing_cache_keys.add(cache_key)
-    asyncio.create_task(_run_process_and_cache(urls))
-    return JSONResponse(
-        status_code=202,
-        content={
-            "status": "processing",
-            "message": "Analysis started in background. Call this endpoint again with the same URLs to retrieve the result.",
-        },
-    )
-
-
-@router.post("/")
+    domains = _domains_for_urls(urls)
+    cache_key = _cache_key_for_domains(domains)
+    # Valkey I/O is blocking; keep it off the event loop.
+    payload = await asyncio.to_thread(_get_cached_payload, cache_key, domains)
+    if payload is not None:
+        logger.info("Returning cached TOS analysis (cache_key=%s, %d bytes)", cache_key, len(payload))
+        return Response(content=payload, media_type="application/json")
+    await _start_processing(cache_key, urls)
+    return _processing_response()
+
+
+@router.post("/", responses={200: {"model": PolicyAnalysis}})
 async def tos_processor_root(
     urls: list[str] = Body(..., description="List of URLs to fetch")
-) -> dict:
+) -> Response:
     """
     Return cached analysis if available. Otherwise start processing in the background
     and return 202; call again with the same URLs to get the result once ready.
     """
     if not urls:
         raise HTTPException(status_code=400, detail="At least one URL is required")
-    cache_key = _cache_key_for_urls(urls)
-    try:
-        cached = get_json(cache_key, PolicyAnalysis)
-    except Exception as e:
-        logger.warning("Cache lookup failed: %s", e)
-        cached = None
-    if cached is not None:
-        payload = cached.model_dump()
-        payload = _enrich_with_top_risks(payload, urls)
-        logger.info(
-            "Returning TOS analysis for overlay (cache_key=%s): %s",
-            cache_key,
-            payload,
-        )
-        return payload
-    if cache_key in _processing_cache_keys:
-        logger.info("Skipping redundant process request for cache_key=%s", cache_key)
-        return JSONResponse(
-            status_code=202,
-            content={
-                "status": "processing",
-                "message": "Analysis started in background. Call this endpoint again with the same URLs to retrieve the result.",
-            },
-        )
-    _processing_cache_keys.add(cache_key)
-    asyncio.create_task(_run_process_and_cache(urls))
-    return JSONResponse(
-        status_code=202,
-        content={
-            "status": "processing",
-            "message": "Analysis started in background. Call this endpoint again with the same URLs to retrieve the result.",
-        },
-    )
+    domains = _domains_for_urls(urls)
+    cache_key = _cache_key_for_domains(domains)
+    # Valkey I/O is blocking; keep it off the event loop.
+    payload = await asyncio.to_thread(_get_cached_payload, cache_key, domains)
+    if payload is not None:
+        logger.info("Returning cached TOS analysis (cache_key=%s, %d bytes)", cache_key, len(payload))
+        return Response(content=payload, media_type="application/json")
+    await _start_processing(cache_key, urls)
+    return _processing_response()
@@ -25,6 +25,28 @@ class Settings(BaseSettings):
     valkey_host: str = "localhost"
     valkey_port: int = 6379
     valkey_password: str = ""
+    valkey_max_connections: int = 64
+    # Unix socket path of a co-located Valkey; when set, host and port are ignored
+    valkey_unix_socket: str = ""
+    # Seconds a pooled connection may sit idle before it is PINGed on checkout
+    valkey_health_check_interval: int = 30
+
+    # In-process cache of parsed TOS analyses used by the overlay summary
+    overlay_cache_ttl_seconds: float = 30.0
+    overlay_cache_max_entries: int = 1024
+
+    # In-process cache of the attribute severity map (config:attribute_severity)
+    severity_cache_ttl_seconds: float = 60.0
+
+    # Valkey lock that lets one worker at a time run a TOS extraction per cache key
+    tos_process_lock_ttl_seconds: int = 300
+    # Lifetime of the content-addressed analyses (tos:content:*) reused for unchanged text
+    tos_content_cache_ttl_seconds: int = 30 * 24 * 3600
+
+    # Per-domain Playwright storage state of rendered policy sites. Holds their session
+    # cookies and localStorage unencrypted, in a directory kept at mode 0700. Relative
+    # paths are resolved against the backend directory; empty disables saving state.
+    browser_state_dir: str = ".cache/pw_state"
 
 
 @lru_cache
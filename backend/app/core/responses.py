@@ -0,0 +1,22 @@
+"""orjson-backed JSON serialization for prebuilt responses."""
+
+from typing import Any
+
+import orjson
+from pydantic import BaseModel
+
+
+def _orjson_default(value: Any) -> Any:
+    """Serialize types orjson does not handle natively (datetime/UUID already are)."""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, bytes):
+        return value.decode("utf-8")
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize *content* to JSON bytes with orjson."""
+    return orjson.dumps(content, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS)
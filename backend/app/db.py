@@ -1,6 +1,8 @@
 """Valkey (Redis-compatible) connection and session management."""
 
-from redis import Redis
+from typing import Any
+
+from redis import ConnectionPool, Redis, UnixDomainSocketConnection
 
 from app.core.config import get_settings
 
@@ -9,15 +11,35 @@ _client: Redis | None = None
 
 
 def connect() -> None:
-    """Create and store the Valkey connection (call on app startup)."""
+    """
+    Create and store the Valkey client (call on app startup).
+
+    The client is backed by a bounded connection pool shared by every request; redis-py
+    uses the hiredis reply parser automatically when it is installed. With
+    ``valkey_unix_socket`` set, connections go over that socket instead of TCP.
+    """
     global _client
     settings = get_settings()
-    _client = Redis(
-        host=settings.valkey_host,
-        port=settings.valkey_port,
-        password=settings.valkey_password or None,
-        decode_responses=False,
-    )
+    common: dict[str, Any] = {
+        "password": settings.valkey_password or None,
+        "max_connections": settings.valkey_max_connections,
+        "health_check_interval": settings.valkey_health_check_interval,
+        "decode_responses": False,
+    }
+    if settings.valkey_unix_socket:
+        pool = ConnectionPool(
+            connection_class=UnixDomainSocketConnection,
+            path=settings.valkey_unix_socket,
+            **common,
+        )
+    else:
+        pool = ConnectionPool(
+            host=settings.valkey_host,
+            port=settings.valkey_port,
+            socket_keepalive=True,
+            **common,
+        )
+    _client = Redis(connection_pool=pool)
 
 
 def close() -> None:
@@ -25,6 +47,7 @@ def close() -> None:
     global _client
     if _client is not None:
         _client.close()
+        _client.connection_pool.disconnect()
         _client = None
 
 
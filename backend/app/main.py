@@ -9,6 +9,7 @@ from fastapi import FastAPI
 from app.api.router import api_router
 from app.core.config import get_settings
 from app.db import close as db_close, connect as db_connect
+from app.utils.fetch_page import close_browser, close_http_client, open_http_client
 
 logging.basicConfig(level=logging.INFO)
 
@@ -17,9 +18,12 @@ logging.basicConfig(level=logging.INFO)
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     """Startup and shutdown events."""
     db_connect()
+    open_http_client()
     try:
         yield
     finally:
+        await close_http_client()
+        await close_browser()
         db_close()
 
 
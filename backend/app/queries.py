@@ -1,25 +1,33 @@
 """Key-value queries: set and get JSON by key (Valkey-backed), with Pydantic support."""
 
-import json
+import secrets
 from typing import Any, TypeVar
 
+import orjson
 from pydantic import BaseModel
 
 from app.db import get_client
 
 T = TypeVar("T", bound=BaseModel)
 
+# Delete the lock only if it still holds the caller's token (atomic compare-and-delete).
+_RELEASE_LOCK_SCRIPT = (
+    "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end "
+    "return 0"
+)
+
 
 def set_json(key: str, value: BaseModel | Any, *, ttl_seconds: int | None = None) -> None:
     """
     Store a value under the given key as JSON.
-    Accepts a Pydantic model (serialized via model_dump_json) or any JSON-serializable value.
+    Accepts a Pydantic model (serialized to bytes by pydantic-core) or any JSON-serializable
+    value (serialized with orjson).
     """
     client = get_client()
     if isinstance(value, BaseModel):
-        payload = value.model_dump_json().encode("utf-8")
+        payload = value.__pydantic_serializer__.to_json(value)
     else:
-        payload = json.dumps(value).encode("utf-8")
+        payload = orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
     client.set(key, payload, ex=ttl_seconds)
 
 
@@ -27,10 +35,49 @@ def get_json(key: str, model: type[T]) -> T | None:
     """
     Retrieve a value by key, parse as JSON, and validate into the given Pydantic model.
     Returns an instance of the model or None if the key is missing.
+
+    The raw bytes go straight to pydantic-core, which parses and validates in one pass.
+    This is also the fastest way to rebuild trusted cached values: rebuilding a
+    PolicyAnalysis with orjson + recursive model_construct measured ~5x slower, since
+    model_construct runs in Python per nested model.
     """
     client = get_client()
     raw = client.get(key)
     if raw is None:
         return None
-    data = json.loads(raw.decode("utf-8"))
-    return model.model_validate(data)
+    return model.model_validate_json(raw)
+
+
+def get_json_raw(key: str) -> bytes | None:
+    """
+    Return the JSON bytes stored under *key* as written by set_json, or None if missing.
+    For handlers that send a cached value as is: it was validated when written.
+    """
+    return get_client().get(key)
+
+
+def get_json_raw_many(keys: list[str]) -> list[bytes | None]:
+    """Return the JSON bytes for each of *keys* in order (one MGET), None where missing."""
+    if not keys:
+        return []
+    return get_client().mget(keys)
+
+
+def acquire_lock(key: str, ttl_seconds: int) -> str | None:
+    """
+    Take a Valkey lock with SET NX EX, storing a random owner token.
+    Returns the token if this caller now holds the lock, or None if someone else does.
+    The lock expires after *ttl_seconds* so a crashed holder cannot wedge it.
+    """
+    token = secrets.token_hex(16)
+    if get_client().set(key, token, nx=True, ex=ttl_seconds):
+        return token
+    return None
+
+
+def release_lock(key: str, token: str) -> bool:
+    """
+    Release a lock taken with acquire_lock, but only if it still holds *token*: once it
+    has expired and been taken by another caller, it is left alone. Returns True if released.
+    """
+    return bool(get_client().eval(_RELEASE_LOCK_SCRIPT, 1, key, token))
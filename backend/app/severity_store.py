@@ -2,16 +2,29 @@
 
 from __future__ import annotations
 
-import json
 import logging
+import threading
+import time
+from collections.abc import Iterable
 from typing import Any
 
+import orjson
+
+from app.core.config import get_settings
 from app.db import get_client
 
 logger = logging.getLogger(__name__)
 
 SEVERITY_KEY = "config:attribute_severity"
 SITE_ATTRS_PREFIX = "tos:attrs:"
+# Per-domain ZSET of red attributes, one per section type, scored by sensitivity_level.
+SITE_RED_ATTRS_PREFIX = "tos:red_attrs:"
+# Sole member of the red ZSET of a domain with no red attributes (Valkey drops empty
+# ZSETs), so readers can tell it apart from a domain stored before the red ZSET existed.
+NO_RED_ATTRIBUTES_MARKER = "_none"
+# Per-domain overlay payload JSON, precomputed from the red ZSET (see overlay_summary).
+SITE_OVERLAY_PREFIX = "tos:overlay:"
+TOP_RED_ATTRIBUTES = 3
 
 # Per-attribute entry: color + sensitivity_level. ZSET uses sensitivity_level as score.
 SeverityEntry = dict[str, Any]  # {"color": str, "sensitivity_level": int}
@@ -67,30 +80,142 @@ DEFAULT_ATTRIBUTE_SEVERITY: dict[str, SeverityEntry] = {
 }
 
 
-def get_attribute_severity_map() -> dict[str, SeverityEntry]:
+# Map each attribute name to its data-collection section type (for deduplicating by type in overlay).
+# Section types align with data_collection in PolicyAnalysis: one entry per "category" of data.
+ATTRIBUTE_TO_SECTION_TYPE: dict[str, str] = {
+    # personal_identifiers
+    "name": "personal_identifiers",
+    "email": "personal_identifiers",
+    "phone_number": "personal_identifiers",
+    "physical_address": "personal_identifiers",
+    "date_of_birth": "personal_identifiers",
+    "government_id": "personal_identifiers",
+    "financial_account": "personal_identifiers",
+    "biometric": "sensitive_data",
+    "photo": "personal_identifiers",
+    "gender": "personal_identifiers",
+    "nationality": "personal_identifiers",
+    "race_ethnicity": "sensitive_data",
+    # ip_address (own section)
+    "ip_address": "ip_address",
+    # precise_location
+    "precise_gps": "precise_location",
+    "coarse_location": "precise_location",
+    "wifi_cell": "precise_location",
+    "ip_derived": "precise_location",
+    # device_fingerprinting
+    "device_id": "device_fingerprinting",
+    "browser_info": "device_fingerprinting",
+    "os": "device_fingerprinting",
+    "screen_resolution": "device_fingerprinting",
+    "language": "device_fingerprinting",
+    "timezone": "device_fingerprinting",
+    "fingerprint": "device_fingerprinting",
+    # user_content
+    "posts": "user_content",
+    "messages": "user_content",
+    "photos": "user_content",
+    "videos": "user_content",
+    "search_history": "user_content",
+    "purchase_history": "user_content",
+    "contacts": "user_content",
+    # third_party_data
+    "social_media": "third_party_data",
+    "advertisers": "third_party_data",
+    "analytics": "third_party_data",
+    "data_brokers": "third_party_data",
+    "affiliates": "third_party_data",
+    # sensitive_data
+    "health": "sensitive_data",
+    "genetic": "sensitive_data",
+    "political": "sensitive_data",
+    "religious": "sensitive_data",
+    "sexual_orientation": "sensitive_data",
+    "union_membership": "sensitive_data",
+    "criminal": "sensitive_data",
+    # age/special (treat as sensitive for overlay)
+    "age_under_13": "sensitive_data",
+    "age_13_to_17": "sensitive_data",
+    "parental_consent_required": "sensitive_data",
+}
+
+
+# (deadline, map) of the last HGETALL of SEVERITY_KEY; the map changes rarely.
+_severity_cache: tuple[float, dict[str, SeverityEntry]] | None = None
+_severity_cache_lock = threading.Lock()
+
+
+def get_attribute_severity_map(*, use_cache: bool = True) -> dict[str, SeverityEntry]:
     """
     Return the full attribute -> {color, sensitivity_level} map from Valkey.
 
     Each value is {"color": "red"|"yellow"|"green", "sensitivity_level": int}.
     Empty dict if not set. Supports legacy stored values (plain color string) by
     normalizing to the new shape with sensitivity_level from defaults.
+
+    The map is memoized in-process for a short TTL; treat the result as read-only.
+    A re-seed only clears the memo in the worker that handled it, so code that stores
+    data derived from the map (site attribute ZSETs) passes ``use_cache=False``.
     """
+    global _severity_cache
+    now = time.monotonic()
+    with _severity_cache_lock:
+        if use_cache and _severity_cache is not None and _severity_cache[0] > now:
+            return _severity_cache[1]
     client = get_client()
-    raw = client.hgetall(SEVERITY_KEY)
+    severity_map = _parse_severity_map(client.hgetall(SEVERITY_KEY))
+    with _severity_cache_lock:
+        _severity_cache = (now + get_settings().severity_cache_ttl_seconds, severity_map)
+    return severity_map
+
+
+# (severity map, flat attribute -> float(sensitivity_level)) for the last map scored.
+_levels_cache: tuple[dict[str, SeverityEntry], dict[str, float]] | None = None
+
+
+def _sensitivity_levels(severity_map: dict[str, SeverityEntry]) -> dict[str, float]:
+    """
+    Flatten *severity_map* over the defaults into attribute -> ZSET score.
+
+    Memoized on the map object, which get_attribute_severity_map() reuses for its TTL,
+    so scoring an attribute is one dict lookup instead of nested lookups and checks.
+    """
+    global _levels_cache
+    cached = _levels_cache
+    if cached is not None and cached[0] is severity_map:
+        return cached[1]
+    levels = {attr: float(entry["sensitivity_level"]) for attr, entry in DEFAULT_ATTRIBUTE_SEVERITY.items()}
+    for attr, entry in severity_map.items():
+        if not entry:
+            continue
+        levels[attr] = float(int(entry["sensitivity_level"])) if isinstance(entry, dict) and "sensitivity_level" in entry else 1.0
+    _levels_cache = (severity_map, levels)
+    return levels
+
+
+def invalidate_severity_map_cache() -> None:
+    """Drop the in-process severity map so the next read goes to Valkey."""
+    global _severity_cache
+    with _severity_cache_lock:
+        _severity_cache = None
+
+
+def _parse_severity_map(raw: dict[Any, Any]) -> dict[str, SeverityEntry]:
+    """Decode an HGETALL reply of the severity hash into attribute -> SeverityEntry."""
     if not raw:
         return {}
     out: dict[str, SeverityEntry] = {}
     for k, v in raw.items():
         key = k.decode("utf-8") if isinstance(k, bytes) else k
-        val_str = v.decode("utf-8") if isinstance(v, bytes) else v
         try:
-            entry = json.loads(val_str)
-            if isinstance(entry, dict) and "color" in entry and "sensitivity_level" in entry:
-                out[key] = entry
-            else:
-                out[key] = _legacy_entry(key, val_str)
-        except json.JSONDecodeError:
-            out[key] = _legacy_entry(key, val_str)
+            # orjson parses the reply bytes directly; only legacy values need decoding.
+            entry = orjson.loads(v)
+        except orjson.JSONDecodeError:
+            entry = None
+        if isinstance(entry, dict) and "color" in entry and "sensitivity_level" in entry:
+            out[key] = entry
+        else:
+            out[key] = _legacy_entry(key, v.decode("utf-8") if isinstance(v, bytes) else v)
     return out
 
 
@@ -101,50 +226,159 @@ def _legacy_entry(attr: str, color: str) -> SeverityEntry:
 
 
 def set_attribute_severity_map(mapping: dict[str, SeverityEntry]) -> None:
-    """Store the attribute -> {color, sensitivity_level} map in Valkey (HSET, JSON value). No TTL."""
+    """
+    Store the attribute -> {color, sensitivity_level} map in Valkey (HSET, JSON value). No TTL.
+
+    Every stored site's attribute ZSETs are scored and colored from this map, so they
+    are rebuilt against the new map (see rebuild_site_attributes), and the overlay
+    payloads precomputed from them are deleted to be recomputed on read.
+    """
     client = get_client()
     client.delete(SEVERITY_KEY)
-    if not mapping:
-        return
-    payload: dict[str, str] = {}
+    stored: dict[str, SeverityEntry] = {}
     for attr, entry in mapping.items():
         if isinstance(entry, dict) and "color" in entry and "sensitivity_level" in entry:
-            payload[attr] = json.dumps(entry)
+            stored[attr] = entry
         else:
-            payload[attr] = json.dumps({"color": "green", "sensitivity_level": 1})
-    client.hset(SEVERITY_KEY, mapping=payload)
+            stored[attr] = {"color": "green", "sensitivity_level": 1}
+    if stored:
+        payload = {attr: orjson.dumps(entry) for attr, entry in stored.items()}
+        client.hset(SEVERITY_KEY, mapping=payload)
+    invalidate_severity_map_cache()
+    rebuild_site_attributes(stored)
+    _unlink_matching(f"{SITE_OVERLAY_PREFIX}*")
+
+
+def _unlink_matching(pattern: str, batch_size: int = 500) -> int:
+    """SCAN for keys matching *pattern* and UNLINK them in batches. Returns the count."""
+    client = get_client()
+    keys = list(client.scan_iter(match=pattern, count=batch_size))
+    for start in range(0, len(keys), batch_size):
+        client.unlink(*keys[start : start + batch_size])
+    return len(keys)
+
+
+def rebuild_site_attributes(severity_map: dict[str, SeverityEntry]) -> int:
+    """
+    Re-score every domain's attribute ZSET and rewrite its red-attribute ZSET from
+    *severity_map*. Both are derived from the map when a site is stored, so call this
+    whenever the map changes. Returns the number of domains rewritten.
+    """
+    client = get_client()
+    keys = [
+        key.decode("utf-8") if isinstance(key, bytes) else key
+        for key in client.scan_iter(match=f"{SITE_ATTRS_PREFIX}*", count=500)
+    ]
+    if not keys:
+        return 0
+    pipe = client.pipeline(transaction=False)
+    for key in keys:
+        pipe.zrange(key, 0, -1)
+    members_per_key = pipe.execute()
+
+    # Domains of one site share the same attribute list; rewrite them together.
+    domains_by_attrs: dict[tuple[str, ...], list[str]] = {}
+    for key, members in zip(keys, members_per_key):
+        attrs = tuple(sorted(m.decode("utf-8") if isinstance(m, bytes) else m for m in members))
+        domains_by_attrs.setdefault(attrs, []).append(key[len(SITE_ATTRS_PREFIX):])
+    for attrs, domains in domains_by_attrs.items():
+        set_site_attributes_many(domains, list(attrs), severity_map)
+    return len(keys)
+
 
 def _site_key(domain: str) -> str:
     return f"{SITE_ATTRS_PREFIX}{domain}"
 
 
-def set_site_attributes(domain: str, attributes: list[str]) -> None:
+def _red_key(domain: str) -> str:
+    return f"{SITE_RED_ATTRS_PREFIX}{domain}"
+
+
+def top_red_attributes(
+    attributes: list[dict[str, Any]], n: int | None = TOP_RED_ATTRIBUTES
+) -> list[dict[str, Any]]:
+    """
+    From *attributes* sorted highest sensitivity first, return the first *n* red ones
+    with distinct section types (no duplicate categories). ``n=None`` keeps all of them.
+    """
+    section_type_of = ATTRIBUTE_TO_SECTION_TYPE.get
+    seen_section_types: set[str] = set()
+    top: list[dict[str, Any]] = []
+    for a in attributes:
+        attr_name = a.get("attribute")
+        if a.get("color") != "red" or not attr_name:
+            continue
+        section_type = section_type_of(attr_name, attr_name)
+        if section_type in seen_section_types:
+            continue
+        seen_section_types.add(section_type)
+        top.append(a)
+        if n is not None and len(top) >= n:
+            break
+    return top
+
+
+def set_site_attributes(
+    domain: str,
+    attributes: list[str],
+    severity_map: dict[str, SeverityEntry] | None = None,
+) -> None:
     """
     Store the list of attributes found for *domain* in a ZSET scored by sensitivity_level.
 
-    Looks up each attribute's sensitivity_level from the global severity map in Valkey.
+    Looks up each attribute's sensitivity_level from the global severity map in Valkey
+    (read uncached), or from *severity_map* when the caller already has it.
     Higher score = higher sensitivity = first in sort order. No TTL.
+    Also rewrites the domain's red-attribute ZSET (one attribute per section type).
     """
-    severity_map = get_attribute_severity_map()
-    if not severity_map:
-        logger.warning("Severity map is empty; falling back to defaults for scoring")
-        severity_map = DEFAULT_ATTRIBUTE_SEVERITY.copy()
+    set_site_attributes_many([domain], attributes, severity_map)
 
-    key = _site_key(domain)
-    client = get_client()
-    client.delete(key)
 
-    if not attributes:
-        return
-
-    scored: dict[str, float] = {}
-    for attr in attributes:
-        entry = severity_map.get(attr) or DEFAULT_ATTRIBUTE_SEVERITY.get(attr)
-        level = int(entry["sensitivity_level"]) if isinstance(entry, dict) and "sensitivity_level" in entry else 1
-        scored[attr] = float(level)
+def set_site_attributes_many(
+    domains: Iterable[str],
+    attributes: list[str],
+    severity_map: dict[str, SeverityEntry] | None = None,
+) -> None:
+    """
+    Store the same *attributes* for every domain in *domains* (see set_site_attributes).
 
-    client.zadd(key, scored)
-    logger.info("Stored %d attributes for domain %s", len(scored), domain)
+    Scores are computed once and all DEL/ZADD commands go out in one pipeline, so a
+    site with several hostnames costs a single Valkey round-trip.
+    """
+    domains = list(domains)
+    if not domains:
+        return
+    if severity_map is None:
+        severity_map = get_attribute_severity_map(use_cache=False)
+    if not severity_map:
+        logger.warning("Severity map is empty; falling back to defaults for scoring")
+        severity_map = DEFAULT_ATTRIBUTE_SEVERITY
+
+    level_of = _sensitivity_levels(severity_map).get
+    scored = {attr: level_of(attr, 1.0) for attr in attributes}
+
+    # Materialize the overlay's candidates: the highest red attribute per section type,
+    # so readers fetch just the top N with one ZREVRANGE.
+    ranked = sorted(scored.items(), key=lambda item: (item[1], item[0]), reverse=True)
+    red = top_red_attributes(_site_attributes_from_zset(ranked, severity_map), n=None)
+    red_scored = {a["attribute"]: float(a["sensitivity_level"]) for a in red}
+
+    pipe = get_client().pipeline(transaction=False)
+    for domain in domains:
+        key = _site_key(domain)
+        red_key = _red_key(domain)
+        pipe.delete(key, red_key)
+        if scored:
+            pipe.zadd(key, scored)
+        pipe.zadd(red_key, red_scored or {NO_RED_ATTRIBUTES_MARKER: 0.0})
+    pipe.execute()
+    logger.info(
+        "Stored %d attributes (%d red) for %d domain(s): %s",
+        len(scored),
+        len(red_scored),
+        len(domains),
+        ", ".join(domains),
+    )
 
 
 def get_site_attributes(domain: str) -> list[dict[str, Any]]:
@@ -159,8 +393,43 @@ def get_site_attributes(domain: str) -> list[dict[str, Any]]:
     raw = client.zrevrange(key, 0, -1, withscores=True)
     if not raw:
         return []
+    return _site_attributes_from_zset(raw, get_attribute_severity_map())
+
+
+def get_overlay_bundle(
+    domain: str, *keys: str, n: int = TOP_RED_ATTRIBUTES
+) -> tuple[list[dict[str, Any]], list[bytes | None]]:
+    """
+    Return ``(top red attributes, values of keys)`` for *domain* in one Valkey round-trip.
 
-    severity_map = get_attribute_severity_map()
+    Pipelines ``ZREVRANGE 0 n-1`` on the domain's red-attribute ZSET, an EXISTS on its
+    attribute ZSET and a GET of each of *keys* (e.g. the cached analysis), in order;
+    values are None where missing. Only domains stored before the red ZSET existed fall
+    back to filtering the full attribute list (a second round-trip).
+    """
+    pipe = get_client().pipeline(transaction=False)
+    pipe.zrevrange(_red_key(domain), 0, n - 1, withscores=True)
+    pipe.exists(_site_key(domain))
+    for key in keys:
+        pipe.get(key)
+    red, has_attributes, *values = pipe.execute()
+
+    if red:
+        top = []
+        for member, score in red:
+            attr = member.decode("utf-8") if isinstance(member, bytes) else member
+            if attr != NO_RED_ATTRIBUTES_MARKER:
+                top.append({"attribute": attr, "color": "red", "sensitivity_level": int(score)})
+        return top, values
+    if not has_attributes:
+        return [], values
+    return top_red_attributes(get_site_attributes(domain), n), values
+
+
+def _site_attributes_from_zset(
+    raw: list[tuple[Any, float]], severity_map: dict[str, SeverityEntry]
+) -> list[dict[str, Any]]:
+    """Shape a ZREVRANGE WITHSCORES reply into attribute dicts, colored from *severity_map*."""
     if not severity_map:
         severity_map = {k: v for k, v in DEFAULT_ATTRIBUTE_SEVERITY.items()}
 
@@ -176,33 +445,40 @@ def get_site_attributes(domain: str) -> list[dict[str, Any]]:
         })
     return result
 
+
+# data_collection sections that carry a "types" list of attribute names.
+_TYPED_SECTION_KEYS = (
+    "personal_identifiers",
+    "precise_location",
+    "device_fingerprinting",
+    "user_content",
+    "third_party_data",
+    "sensitive_data",
+)
+# Signal.status values meaning the ip_address signal was found.
+_COLLECTED_STATUSES = frozenset(("true", "True", True))
+
+
 def collect_attributes_from_data_collection(data_collection: dict[str, Any]) -> list[str]:
     """
     Given the ``data_collection`` section of a ``PolicyAnalysis`` dict, return a
-    de-duplicated list of attribute name strings found in the extraction.
+    de-duplicated, sorted list of attribute name strings found in the extraction.
 
     Handles both ``types``-style sub-objects and ``Signal``-style (ip_address).
+    The dict comes from a validated model, so types are taken as strings.
     """
     attrs: set[str] = set()
-
-    # Sub-sections that have a "types" list
-    for section_key in (
-        "personal_identifiers",
-        "precise_location",
-        "device_fingerprinting",
-        "user_content",
-        "third_party_data",
-        "sensitive_data",
-    ):
-        section = data_collection.get(section_key)
-        if section and isinstance(section, dict):
-            for t in section.get("types", []):
-                if isinstance(t, str):
-                    attrs.add(t)
+    for section_key in _TYPED_SECTION_KEYS:
+        try:
+            attrs.update(data_collection[section_key]["types"])
+        except (KeyError, TypeError):
+            pass
 
     # ip_address is a Signal; include if status indicates collection
-    ip_signal = data_collection.get("ip_address")
-    if isinstance(ip_signal, dict) and ip_signal.get("status") in ("true", "True", True):
-        attrs.add("ip_address")
+    try:
+        if data_collection["ip_address"]["status"] in _COLLECTED_STATUSES:
+            attrs.add("ip_address")
+    except (KeyError, TypeError):
+        pass
 
     return sorted(attrs)
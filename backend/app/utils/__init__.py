@@ -1,7 +1,32 @@
-"""Application utilities."""
+"""Application utilities.
 
-from app.utils.fetch_page import fetch_page_content, html_to_text
-from app.utils.gemini import GeminiClient
-from app.utils.url_utils import get_domain
+Exports are resolved lazily (PEP 562) so importing one utility module, e.g.
+``app.utils.url_utils``, does not also load Playwright and the Gemini SDK.
+"""
 
-__all__ = ["fetch_page_content", "get_domain", "html_to_text", "GeminiClient"]
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from app.utils.fetch_page import fetch_page_content, fetch_pages_content, html_to_text
+    from app.utils.gemini import GeminiClient
+    from app.utils.url_utils import get_domain
+
+_EXPORTS = {
+    "fetch_page_content": "app.utils.fetch_page",
+    "fetch_pages_content": "app.utils.fetch_page",
+    "html_to_text": "app.utils.fetch_page",
+    "GeminiClient": "app.utils.gemini",
+    "get_domain": "app.utils.url_utils",
+}
+
+__all__ = ["fetch_page_content", "fetch_pages_content", "get_domain", "html_to_text", "GeminiClient"]
+
+
+def __getattr__(name: str) -> Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module), name)
+    globals()[name] = value
+    return value
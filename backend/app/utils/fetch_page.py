@@ -1,68 +1,396 @@
 """Utility to download a page by URL and extract its text content."""
 
+import asyncio
+import codecs
 import logging
+import os
 import re
+import tempfile
+from pathlib import Path
 
 import httpx
-from bs4 import BeautifulSoup
-from playwright.async_api import async_playwright
+import orjson
+from playwright.async_api import (
+    Browser,
+    BrowserContext,
+    Page,
+    Playwright,
+    Route,
+    async_playwright,
+)
+from playwright.async_api import Error as PlaywrightError
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from selectolax.lexbor import LexborHTMLParser
+
+from app.core.config import get_settings
+from app.utils.url_utils import get_domain
 
 logger = logging.getLogger(__name__)
 
+# Elements whose content is never visible page text.
+_NON_VISIBLE_TAGS = ["head", "script", "style", "noscript", "iframe", "svg", "template"]
 
-def html_to_text(html: str) -> str:
-    """
-    Extract plain text from HTML: strip tags and normalize whitespace.
-    Removes script, style, and other non-visible elements.
+# Upper bound on pages rendered/downloaded at once by fetch_pages_content.
+DEFAULT_FETCH_CONCURRENCY = 4
+
+# Documents larger than this are rejected instead of being buffered in full.
+MAX_PAGE_BYTES = 5 * 1024 * 1024
+
+# Shared HTTP client (opened in the app lifespan) so connections, TLS sessions and
+# HTTP/2 streams are reused across requests instead of set up per fetch.
+HTTP_TIMEOUT = httpx.Timeout(15.0)
+HTTP_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+# Ask for HTML the way a browser would; many sites serve bot walls to python-httpx.
+# Accept-Encoding is left to httpx, which offers br/zstd when brotli/zstandard are installed.
+HTTP_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/124.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8",
+}
+_http_client: httpx.AsyncClient | None = None
+
+# Browser fetches try a plain HTTP request first and only render the page in Chromium
+# when the static HTML has too little text or looks like a client-rendered shell.
+STATIC_PROBE_TIMEOUT = httpx.Timeout(5.0)
+MIN_STATIC_TEXT_CHARS = 500
+_CLIENT_RENDERED_RE = re.compile(
+    rb"""<div[^>]*\bid=["'](?:root|app|__next)["'][^>]*>\s*</div>"""
+    rb"|\bng-app\b"
+    rb"|<noscript[^>]*>[^<]*enable javascript",
+    re.IGNORECASE,
+)
+# Domains whose pages needed the browser, so later fetches skip the probe.
+MAX_BROWSER_DOMAINS = 4096
+_browser_domains: set[str] = set()
+
+# Shared Chromium, launched on the first browser fetch and closed in the app lifespan,
+# so requests pay for a fresh BrowserContext per page instead of a browser cold start.
+# At most BROWSER_MAX_CONTEXTS pages are open in it at once, across all requests.
+BROWSER_MAX_CONTEXTS = 8
+_playwright: Playwright | None = None
+_browser: Browser | None = None
+_browser_lock = asyncio.Lock()
+_browser_slots = asyncio.Semaphore(BROWSER_MAX_CONTEXTS)
+# Headless flags for a server without a GPU and with a small /dev/shm. The Chromium
+# sandbox stays on: the pages rendered are arbitrary third-party sites.
+_BROWSER_ARGS = ("--disable-dev-shm-usage", "--disable-gpu", "--disable-extensions")
+# Subresources html_to_text never looks at; aborting them saves most of a page's bytes.
+_BLOCKED_RESOURCE_TYPES = frozenset({"image", "media", "font", "stylesheet"})
+# After DOMContentLoaded, wait (each bounded) for the load event and then for the page to
+# show as much text as a static page needs; networkidle never fires on pages that keep
+# analytics or long-poll connections open.
+RENDER_WAIT_TIMEOUT_MS = 5_000
+_HAS_RENDERED_TEXT_JS = "n => document.body !== null && document.body.innerText.length >= n"
+# Cookies/local storage are saved per registered domain after each rendered page and
+# loaded into the next context for that domain, so consent walls dismissed once (and
+# the redirects they cause) are skipped on later visits. Domains don't share state.
+# The files hold session cookies: see settings.browser_state_dir.
+_BACKEND_DIR = Path(__file__).resolve().parents[2]
+_STATE_FILE_DOMAIN_RE = re.compile(r"[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*")
+# A visible cookie/consent button with one of these labels is clicked before extraction.
+CONSENT_CLICK_TIMEOUT_MS = 1_500
+_CONSENT_BUTTON_NAME_RE = re.compile(
+    r"^\s*(?:accept|agree|allow|i agree|i accept)(?: all)?(?: cookies)?\s*$", re.IGNORECASE
+)
+
+
+class PageTooLargeError(ValueError):
+    """Raised when a fetched document exceeds MAX_PAGE_BYTES."""
+
+    def __init__(self, url: str, limit: int = MAX_PAGE_BYTES) -> None:
+        super().__init__(f"Page at {url} exceeds {limit} bytes")
+
+
+def _new_http_client(limits: httpx.Limits = HTTP_LIMITS) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        follow_redirects=True,
+        http2=True,
+        headers=HTTP_HEADERS,
+        timeout=HTTP_TIMEOUT,
+        limits=limits,
+    )
+
+
+def open_http_client() -> None:
+    """Create the shared HTTP client (call on app startup)."""
+    global _http_client
+    if _http_client is None:
+        _http_client = _new_http_client()
+
+
+async def close_http_client() -> None:
+    """Close the shared HTTP client (call on app shutdown)."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+async def _get_browser() -> Browser:
+    """Return the shared browser, launching it (again, if it crashed) on demand."""
+    global _playwright, _browser
+    async with _browser_lock:
+        if _browser is None or not _browser.is_connected():
+            if _playwright is None:
+                _playwright = await async_playwright().start()
+            _browser = await _playwright.chromium.launch(headless=True, args=list(_BROWSER_ARGS))
+        return _browser
+
+
+async def close_browser() -> None:
+    """Close the shared browser and stop Playwright, if started (call on app shutdown)."""
+    global _playwright, _browser
+    async with _browser_lock:
+        if _browser is not None:
+            await _browser.close()
+            _browser = None
+        if _playwright is not None:
+            await _playwright.stop()
+            _playwright = None
+
+
+def html_to_text(html: str | bytes) -> str:
     """
-    soup = BeautifulSoup(html, "html.parser")
+    Extract plain text from HTML (str, or UTF-8 bytes): strip tags and normalize whitespace.
+    Removes head, script, style, template, comments, and other non-visible elements.
 
-    for tag in soup(["script", "style", "noscript", "iframe", "svg"]):
-        tag.decompose()
+    Parsed with selectolax's lexbor engine, which builds and walks the tree ~3.5x faster
+    than lxml on policy pages and yields the same text. Invalid UTF-8 becomes U+FFFD.
+    """
+    if not html.strip():
+        return ""
+    tree = LexborHTMLParser(html)
+    tree.strip_tags(_NON_VISIBLE_TAGS)
+    root = tree.body if tree.body is not None else tree.root
+    if root is None:
+        return ""
 
-    text = soup.get_text(separator=" ", strip=True)
-    text = re.sub(r"\s+", " ", text)
-    return text.strip()
+    # str.split() treats exactly the code points regex \s matches as whitespace.
+    return " ".join(root.text(separator=" ").split())
 
 
-async def fetch_page_content(url: str, *, use_browser: bool = True) -> str:
+async def fetch_page_content(
+    url: str,
+    *,
+    use_browser: bool = True,
+    client: httpx.AsyncClient | None = None,
+    browser: Browser | None = None,
+) -> str:
     """
-    Download the page at the given URL, extract text (no HTML tags), and log it at INFO.
+    Download the page at the given URL, extract text (no HTML tags), and log it at DEBUG.
 
-    If use_browser is True (default), uses a headless Chromium browser so JavaScript-
-    rendered content (e.g. Facebook, SPAs) is included. Otherwise uses a plain HTTP request.
+    If use_browser is True (default), JavaScript-rendered content (e.g. Facebook, SPAs) is
+    included: the page is fetched with a plain HTTP request first and rendered in headless
+    Chromium only when that yields too little text or a client-rendered shell. Domains
+    that needed the browser go straight to it afterwards. Otherwise uses a plain HTTP
+    request. Pass an open *client* / *browser* to reuse it; otherwise the shared HTTP
+    client is used when open, and the shared browser is launched on first use.
 
+    Raises PageTooLargeError if the document is larger than MAX_PAGE_BYTES.
     Raises httpx.HTTPError on HTTP errors when use_browser is False.
     Raises playwright-specific errors when use_browser is True.
     """
     if use_browser:
-        raw = await _fetch_with_browser(url)
+        text = await _fetch_static_or_rendered(url, client=client, browser=browser)
     else:
-        raw = await _fetch_with_httpx(url)
+        text = html_to_text(await _fetch_with_httpx(url, client=client))
 
-    text = html_to_text(raw)
-    logger.info("%s", text)
+    # Never log the page text itself: it can be megabytes per request.
+    logger.debug("Fetched %s (%d chars of text)", url, len(text))
     return text
 
 
-async def _fetch_with_httpx(url: str) -> str:
-    async with httpx.AsyncClient(follow_redirects=True, verify=False) as client:
-        response = await client.get(url)
+async def fetch_pages_content(
+    urls: list[str],
+    *,
+    use_browser: bool = True,
+    concurrency: int = DEFAULT_FETCH_CONCURRENCY,
+) -> list[str]:
+    """
+    Fetch several pages concurrently and return their text in the same order as *urls*.
+
+    All pages share one pooled HTTP client and, when rendering is needed, the app's
+    browser, with at most *concurrency* fetches in flight. The first failure is raised,
+    as with fetch_page_content.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _bounded(url: str, client: httpx.AsyncClient) -> str:
+        async with semaphore:
+            return await fetch_page_content(url, use_browser=use_browser, client=client)
+
+    if _http_client is not None:
+        return list(await asyncio.gather(*(_bounded(u, _http_client) for u in urls)))
+    async with _new_http_client(httpx.Limits(max_connections=concurrency)) as client:
+        return list(await asyncio.gather(*(_bounded(u, client) for u in urls)))
+
+
+async def _fetch_static_or_rendered(
+    url: str,
+    *,
+    client: httpx.AsyncClient | None = None,
+    browser: Browser | None = None,
+) -> str:
+    """Return the page text over plain HTTP when that is enough, else render it."""
+    domain = get_domain(url)
+    if domain not in _browser_domains:
+        try:
+            raw = await _fetch_with_httpx(url, client=client, timeout=STATIC_PROBE_TIMEOUT)
+        except httpx.TransportError as e:
+            # Timeouts and connection errors say nothing about the domain; don't remember.
+            logger.debug("Static fetch of %s failed (%s), rendering it", url, e)
+        except httpx.HTTPStatusError:
+            _remember_browser_domain(domain)
+        else:
+            text = html_to_text(raw)
+            if len(text) >= MIN_STATIC_TEXT_CHARS and not _CLIENT_RENDERED_RE.search(raw):
+                return text
+            _remember_browser_domain(domain)
+    return html_to_text(await _fetch_with_browser(url, browser=browser))
+
+
+def _remember_browser_domain(domain: str) -> None:
+    if len(_browser_domains) >= MAX_BROWSER_DOMAINS:
+        _browser_domains.clear()
+    _browser_domains.add(domain)
+
+
+async def _fetch_with_httpx(
+    url: str,
+    *,
+    client: httpx.AsyncClient | None = None,
+    timeout: httpx.Timeout | None = None,
+) -> bytes:
+    """Return the page body as UTF-8 bytes (transcoded only if another charset is declared)."""
+    if client is None:
+        client = _http_client
+    if client is None:
+        async with _new_http_client() as own_client:
+            return await _fetch_with_httpx(url, client=own_client, timeout=timeout)
+    request_timeout = httpx.USE_CLIENT_DEFAULT if timeout is None else timeout
+    async with client.stream("GET", url, timeout=request_timeout) as response:
         response.raise_for_status()
-        return response.text
+        declared = response.headers.get("content-length")
+        if declared is not None and declared.isdigit() and int(declared) > MAX_PAGE_BYTES:
+            raise PageTooLargeError(url)
+        chunks: list[bytes] = []
+        size = 0
+        async for chunk in response.aiter_bytes():
+            size += len(chunk)
+            if size > MAX_PAGE_BYTES:
+                raise PageTooLargeError(url)
+            chunks.append(chunk)
+        body = b"".join(chunks)
+        encoding = response.encoding or "utf-8"
+        if codecs.lookup(encoding).name != "utf-8":
+            body = body.decode(encoding, errors="replace").encode("utf-8")
+        return body
 
 
-async def _fetch_with_browser(url: str) -> str:
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
+async def _fetch_with_browser(url: str, *, browser: Browser | None = None) -> str:
+    if browser is None:
+        browser = await _get_browser()
+    # A fresh context per page keeps cookies/storage isolated between fetches, apart from
+    # the state saved for the page's own domain.
+    state_path = _storage_state_path(url)
+    saved_state = state_path if state_path is not None and state_path.is_file() else None
+    async with _browser_slots:
+        context = await browser.new_context(storage_state=saved_state)
         try:
-            page = await browser.new_page()
-            await page.goto(url, wait_until="domcontentloaded", timeout=30_000)
-            try:
-                await page.wait_for_load_state("networkidle", timeout=10_000)
-            except Exception:
-                logger.debug("networkidle timed out for %s, proceeding with current content", url)
-            content = await page.content()
+            await context.route("**/*", _block_unused_resources)
+            content = await _render_page(context, url)
+            if state_path is not None:
+                await _save_storage_state(context, state_path)
             return content
         finally:
-            await browser.close()
+            await context.close()
+
+
+def _browser_state_dir() -> Path | None:
+    """
+    Absolute directory for saved browser state, from settings.browser_state_dir (relative
+    paths are taken from the backend directory, not the process cwd). None if disabled.
+    """
+    configured = get_settings().browser_state_dir.strip()
+    if not configured:
+        return None
+    path = Path(configured).expanduser()
+    return path if path.is_absolute() else (_BACKEND_DIR / path).resolve()
+
+
+def _storage_state_path(url: str) -> Path | None:
+    """Return the saved-state file for *url*'s domain, or None if it has no usable name."""
+    state_dir = _browser_state_dir()
+    domain = get_domain(url)
+    if state_dir is None or not _STATE_FILE_DOMAIN_RE.fullmatch(domain):
+        return None
+    return state_dir / f"{domain.lower()}.json"
+
+
+async def _save_storage_state(context: BrowserContext, path: Path) -> None:
+    try:
+        state = await context.storage_state()
+        await asyncio.to_thread(_write_file_atomically, path, orjson.dumps(state))
+    except (PlaywrightError, OSError) as e:
+        logger.warning("Could not save browser state to %s: %s", path, e)
+
+
+def _write_file_atomically(path: Path, data: bytes) -> None:
+    # Concurrent fetches of the same domain may save at once; readers never see a
+    # partially written file. The directory is owner-only (also if created earlier), and
+    # NamedTemporaryFile creates the file 0600, which os.replace keeps.
+    path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    os.chmod(path.parent, 0o700)
+    with tempfile.NamedTemporaryFile(dir=path.parent, suffix=".tmp", delete=False) as tmp:
+        tmp.write(data)
+    os.replace(tmp.name, path)
+
+
+async def _block_unused_resources(route: Route) -> None:
+    if route.request.resource_type in _BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+async def _render_page(context: BrowserContext, url: str) -> str:
+    """Load *url* in a new page of *context* and return its HTML (closed with the context)."""
+    page = await context.new_page()
+    await page.goto(url, wait_until="domcontentloaded", timeout=30_000)
+    await _wait_for_render(page, url)
+    if await _dismiss_consent_banner(page):
+        # The click may navigate (consent redirects) or re-render the page; reading the
+        # content before that settles fails on a destroyed context or gets the banner.
+        await _wait_for_render(page, url)
+    content = await page.content()
+    if len(content) > MAX_PAGE_BYTES:
+        raise PageTooLargeError(url)
+    return content
+
+
+async def _wait_for_render(page: Page, url: str) -> None:
+    """Wait for the load event, then for enough rendered text (each bounded, timeouts ignored)."""
+    try:
+        await page.wait_for_load_state("load", timeout=RENDER_WAIT_TIMEOUT_MS)
+        await page.wait_for_function(
+            _HAS_RENDERED_TEXT_JS, arg=MIN_STATIC_TEXT_CHARS, timeout=RENDER_WAIT_TIMEOUT_MS
+        )
+    except PlaywrightTimeoutError:
+        logger.debug("Render wait timed out for %s, proceeding with current content", url)
+
+
+async def _dismiss_consent_banner(page: Page) -> bool:
+    """
+    Click a cookie/consent "Accept" button if one is already visible (never waits for
+    one to appear). Returns True if a button was clicked.
+    """
+    button = page.get_by_role("button", name=_CONSENT_BUTTON_NAME_RE).first
+    try:
+        if await button.is_visible():
+            await button.click(timeout=CONSENT_CLICK_TIMEOUT_MS)
+            return True
+    except PlaywrightError as e:
+        logger.debug("Could not dismiss consent banner: %s", e)
+    return False
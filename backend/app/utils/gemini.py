@@ -1,16 +1,86 @@
 """Gemini LLM utility."""
 
+import asyncio
+import hashlib
+from collections import OrderedDict
+
 import google.generativeai as genai
 
+# Default cap on generate_many requests in flight, to stay inside per-minute quotas.
+DEFAULT_GENERATE_CONCURRENCY = 4
+
+# Responses kept per client for repeated prompts (same page or policy text sent twice).
+DEFAULT_MAX_CACHE_ENTRIES = 256
+
 
 class GeminiClient:
-    """Client for Gemini API. Takes a prompt and returns the model response."""
+    """
+    Client for Gemini API. Takes a prompt and returns the model response.
+
+    The last *max_cache_entries* responses are kept in memory (LRU, keyed on a hash of
+    the prompt), so an identical prompt is answered without another API call. Pass 0 to
+    disable the cache.
+    """
 
-    def __init__(self, api_key: str, *, model: str = "gemini-1.5-flash") -> None:
+    def __init__(
+        self,
+        api_key: str,
+        *,
+        model: str = "gemini-1.5-flash",
+        max_cache_entries: int = DEFAULT_MAX_CACHE_ENTRIES,
+    ) -> None:
         genai.configure(api_key=api_key)
         self._model = genai.GenerativeModel(model)
+        self._max_cache_entries = max_cache_entries
+        self._cache: OrderedDict[bytes, str] = OrderedDict()
 
     def generate(self, prompt: str) -> str:
         """Send the prompt to Gemini and return the generated text."""
+        key = _prompt_key(prompt)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
         response = self._model.generate_content(prompt)
-        return response.text
+        return self._remember(key, response.text)
+
+    async def generate_async(self, prompt: str) -> str:
+        """Like generate, but awaits the SDK's async call instead of blocking the loop."""
+        key = _prompt_key(prompt)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+        response = await self._model.generate_content_async(prompt)
+        return self._remember(key, response.text)
+
+    async def generate_many(
+        self, prompts: list[str], *, concurrency: int = DEFAULT_GENERATE_CONCURRENCY
+    ) -> list[str]:
+        """
+        Generate responses for several prompts concurrently, in the same order as *prompts*.
+
+        At most *concurrency* requests are in flight; the first failure is raised.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def _bounded(prompt: str) -> str:
+            async with semaphore:
+                return await self.generate_async(prompt)
+
+        return list(await asyncio.gather(*(_bounded(p) for p in prompts)))
+
+    def _cached(self, key: bytes) -> str | None:
+        text = self._cache.get(key)
+        if text is not None:
+            self._cache.move_to_end(key)
+        return text
+
+    def _remember(self, key: bytes, text: str) -> str:
+        if self._max_cache_entries > 0:
+            self._cache[key] = text
+            if len(self._cache) > self._max_cache_entries:
+                self._cache.popitem(last=False)
+        return text
+
+
+def _prompt_key(prompt: str) -> bytes:
+    return hashlib.blake2b(prompt.encode("utf-8"), digest_size=16).digest()
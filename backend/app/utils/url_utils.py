@@ -1,8 +1,23 @@
 """URL parsing utilities."""
 
+import re
+from functools import lru_cache
+
 import tldextract
 
+# One extractor per process, using the public suffix list snapshot bundled with
+# tldextract: no live download on first use and no on-disk cache (or its file lock).
+_EXTRACT = tldextract.TLDExtract(suffix_list_urls=(), cache_dir=None)
+
+# Common TLDs with no multi-label public suffixes under them (unlike co, io, ai, uk...),
+# so the registered domain is always the last two labels of the host.
+_SIMPLE_TLDS = frozenset(
+    {"com", "org", "net", "edu", "gov", "dev", "app", "info", "biz", "de", "xyz"}
+)
+_HOST_RE = re.compile(r"[A-Za-z][A-Za-z0-9+.-]*://(?:[^/?#@]*@)?([^/?#:]+)")
 
+
+@lru_cache(maxsize=4096)
 def get_domain(url: str) -> str:
     """
     Return the registered (root) domain from a URL, stripping subdomains.
@@ -11,8 +26,16 @@ def get_domain(url: str) -> str:
         https://policies.google.com/terms -> google.com
         https://myactivity.google.com     -> google.com
         https://sub.example.co.uk:443/    -> example.co.uk
+
+    Results are memoized per URL string; the function is pure. Hosts under a TLD in
+    _SIMPLE_TLDS are split directly, skipping the public suffix list lookup.
     """
-    ext = tldextract.extract(url)
+    match = _HOST_RE.match(url)
+    if match:
+        labels = match.group(1).rsplit(".", 2)
+        if len(labels) > 1 and labels[-1] in _SIMPLE_TLDS and labels[-2]:
+            return f"{labels[-2]}.{labels[-1]}"
+    ext = _EXTRACT(url)
     if ext.domain and ext.suffix:
         return f"{ext.domain}.{ext.suffix}"
     return ext.domain or ""
@@ -1,8 +1,11 @@
 from __future__ import annotations
 
 from copy import deepcopy
+from fnmatch import fnmatchcase
 from typing import Any
 
+from app.api.tos_processor.models import PolicyAnalysis
+
 
 def _to_bytes(value: Any) -> bytes:
     if isinstance(value, bytes):
@@ -10,6 +13,14 @@ def _to_bytes(value: Any) -> bytes:
     return str(value).encode("utf-8")
 
 
+class FakeConnectionPool:
+    def __init__(self) -> None:
+        self.disconnected = False
+
+    def disconnect(self) -> None:
+        self.disconnected = True
+
+
 class FakeRedis:
     def __init__(self) -> None:
         self.values: dict[str, bytes] = {}
@@ -17,11 +28,30 @@ class FakeRedis:
         self.hashes: dict[str, dict[bytes, bytes]] = {}
         self.sorted_sets: dict[str, dict[bytes, float]] = {}
         self.closed = False
+        self.connection_pool = FakeConnectionPool()
 
-    def set(self, key: str, value: bytes | str, ex: int | None = None) -> None:
+    def set(
+        self, key: str, value: bytes | str, ex: int | None = None, nx: bool = False
+    ) -> bool | None:
+        if nx and key in self.values:
+            return None
         self.values[key] = _to_bytes(value)
         if ex is not None:
             self.expiry[key] = ex
+        return True
+
+    def mset(self, mapping: dict[str, bytes | str]) -> bool:
+        for key, value in mapping.items():
+            self.set(key, value)
+        return True
+
+    def incr(self, key: str) -> int:
+        value = int(self.values.get(key, b"0")) + 1
+        self.values[key] = _to_bytes(value)
+        return value
+
+    def mget(self, keys: list[str]) -> list[bytes | None]:
+        return [self.values.get(key) for key in keys]
 
     def get(self, key: str) -> bytes | None:
         return self.values.get(key)
@@ -43,6 +73,16 @@ class FakeRedis:
             deleted += int(existed)
         return deleted
 
+    def unlink(self, *keys: str | bytes) -> int:
+        return self.delete(*(k.decode("utf-8") if isinstance(k, bytes) else k for k in keys))
+
+    def eval(self, script: str, numkeys: int, *args: str) -> int:
+        # Only the compare-and-delete lock release script is used (queries.release_lock).
+        key, token = args[0], args[numkeys]
+        if self.values.get(key) == _to_bytes(token):
+            return self.delete(key)
+        return 0
+
     def exists(self, *keys: str) -> int:
         return sum(
             1
@@ -63,6 +103,14 @@ class FakeRedis:
         for member, score in mapping.items():
             bucket[_to_bytes(member)] = float(score)
 
+    def zrange(self, key: str, start: int, end: int) -> list[bytes]:
+        return list(reversed(self.zrevrange(key, 0, -1)))[start : None if end == -1 else end + 1]
+
+    def scan_iter(self, match: str = "*", count: int | None = None) -> Any:
+        for key in [*self.values, *self.hashes, *self.sorted_sets]:
+            if fnmatchcase(key, match):
+                yield key.encode("utf-8")
+
     def zrevrange(
         self, key: str, start: int, end: int, withscores: bool = False
     ) -> list[Any]:
@@ -79,16 +127,39 @@ class FakeRedis:
             return selected
         return [member for member, _ in selected]
 
+    def pipeline(self, transaction: bool = True) -> FakePipeline:
+        return FakePipeline(self)
+
     def close(self) -> None:
         self.closed = True
 
 
-class DummyCachedModel:
-    def __init__(self, payload: dict[str, Any]) -> None:
-        self.payload = deepcopy(payload)
+class FakePipeline:
+    """Queues FakeRedis calls and runs them in order on execute()."""
 
-    def model_dump(self) -> dict[str, Any]:
-        return deepcopy(self.payload)
+    def __init__(self, client: FakeRedis) -> None:
+        self.client = client
+        self.commands: list[tuple[str, tuple[Any, ...], dict[str, Any]]] = []
+        self.executed = False
+
+    def __getattr__(self, name: str) -> Any:
+        if not callable(getattr(self.client, name, None)):
+            raise AttributeError(name)
+
+        def queue(*args: Any, **kwargs: Any) -> FakePipeline:
+            self.commands.append((name, args, kwargs))
+            return self
+
+        return queue
+
+    def execute(self) -> list[Any]:
+        self.executed = True
+        results = [
+            getattr(self.client, name)(*args, **kwargs)
+            for name, args, kwargs in self.commands
+        ]
+        self.commands = []
+        return results
 
 
 def sample_analysis_payload() -> dict[str, Any]:
@@ -150,3 +221,56 @@ def sample_analysis_payload() -> dict[str, Any]:
             },
         },
     }
+
+
+def _signal(status: str = "not_found") -> dict[str, str]:
+    return {"status": status, "evidence": ""}
+
+
+def sample_policy_analysis() -> PolicyAnalysis:
+    """Full, validated ``PolicyAnalysis`` built around ``sample_analysis_payload``."""
+    payload = sample_analysis_payload()
+    payload["metadata"] = {"domain": "example.com"}
+    payload["data_usage"] = {
+        key: _signal()
+        for key in (
+            "model_training",
+            "advertising",
+            "data_sale",
+            "cross_company_sharing",
+            "anonymization_claimed",
+        )
+    }
+    payload["user_rights"] = {
+        key: _signal()
+        for key in (
+            "access",
+            "correction",
+            "deletion",
+            "portability",
+            "opt_out_ads",
+            "opt_out_training",
+        )
+    }
+    payload["legal_terms"] = {
+        key: _signal()
+        for key in (
+            "liability_cap",
+            "indemnification",
+            "mandatory_arbitration",
+            "class_action_waiver",
+            "unilateral_modification",
+            "termination_without_notice",
+            "perpetual_license",
+        )
+    }
+    payload["red_flags"] = []
+    payload["scores"] = {
+        "privacy_score": 40.0,
+        "posture": "moderate_risk",
+        "data_minimization": 30.0,
+        "retention_transparency": 50.0,
+        "third_party_exposure": 40.0,
+        "user_control": 60.0,
+    }
+    return PolicyAnalysis.model_validate(payload)
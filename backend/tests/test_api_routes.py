@@ -6,10 +6,11 @@ import unittest
 from unittest.mock import AsyncMock, patch
 
 import httpx
+import orjson
 from fastapi.testclient import TestClient
 
 from app.core.config import get_settings
-from tests.fakes import DummyCachedModel, FakeRedis, sample_analysis_payload
+from tests.fakes import FakeRedis, sample_analysis_payload
 
 import importlib
 
@@ -32,6 +33,17 @@ def api_client() -> TestClient:
 
 
 class ApiRouteTests(unittest.TestCase):
+    def test_each_route_is_registered_once(self) -> None:
+        from app.api.router import api_router
+
+        routes = [
+            (route.path, method)
+            for route in api_router.routes
+            for method in sorted(getattr(route, "methods", None) or ())
+        ]
+
+        self.assertEqual(len(routes), len(set(routes)))
+
     def test_root_and_health_endpoints(self) -> None:
         with api_client() as client:
             root_response = client.get("/api/")
@@ -55,6 +67,23 @@ class ApiRouteTests(unittest.TestCase):
         self.assertEqual(response.json(), {"ok": "true"})
         self.assertEqual(fake_client.values["hello"], b"world")
 
+    def test_kv_bulk_endpoint_writes_all_pairs_at_once(self) -> None:
+        fake_client = FakeRedis()
+
+        with api_client() as client, patch(
+            "app.api.kv.get_client", return_value=fake_client
+        ):
+            response = client.post(
+                "/api/kv/bulk",
+                json=[{"key": "a", "value": "1"}, {"key": "b", "value": "2"}],
+            )
+            empty = client.post("/api/kv/bulk", json=[])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"ok": "true", "count": "2"})
+        self.assertEqual(fake_client.values, {"a": b"1", "b": b"2"})
+        self.assertEqual(empty.status_code, 400)
+
     def test_fetch_page_endpoint_handles_success_and_failure(self) -> None:
         with api_client() as client, patch(
             "app.api.fetch_page.fetch_page_content",
@@ -122,36 +151,86 @@ class ApiRouteTests(unittest.TestCase):
         self.assertEqual(failure.status_code, 503)
         self.assertEqual(failure.json()["detail"], "summary failed")
 
+    def test_overlay_summary_endpoint_serves_precomputed_payload(self) -> None:
+        fake_client = FakeRedis()
+        fake_client.values["tos:overlay:example.com"] = b'{"domain":"example.com"}'
+
+        with api_client() as client, patch(
+            "app.api.overlay_summary.get_client", return_value=fake_client
+        ), patch("app.api.overlay_summary.compute_top_risks") as compute:
+            response = client.get(
+                "/api/overlay_summary/top_risks", params={"domain": "www.example.com"}
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"domain": "example.com"})
+        compute.assert_not_called()
+
     def test_tos_processor_cached_endpoint_reports_matches_and_misses(self) -> None:
-        cached_model = DummyCachedModel(sample_analysis_payload())
+        cached_raw = orjson.dumps(sample_analysis_payload())
+        stored = {"tos:process:example.com": cached_raw, "tos:process:legacy.com": b"{}"}
 
-        def fake_get_json(key: str, _model: object) -> DummyCachedModel | None:
-            if key == "tos:process:example.com":
-                return cached_model
-            return None
+        def fake_get_json_raw_many(keys: list[str]) -> list[bytes | None]:
+            return [stored.get(key) for key in keys]
 
         with api_client() as client, patch.object(
-            tos_router_module, "get_json", side_effect=fake_get_json
+            tos_router_module, "get_json_raw_many", side_effect=fake_get_json_raw_many
         ), patch.object(
             tos_router_module,
             "get_domain",
-            side_effect=["example.com", "missing.com", "example.com"],
-        ), patch.object(
-            tos_router_module,
-            "_enrich_with_top_risks",
-            side_effect=lambda payload, _urls: {**payload, "overlay_summary": {"ok": True}},
+            side_effect=["example.com", "missing.com", "legacy.com"],
+        ), patch(
+            "app.api.overlay_summary.top_risks_json", return_value=b'{"ok":true}'
         ):
             response = client.get(
                 "/api/tos_processor/cached",
-                params=[("domain", "www.example.com"), ("domain", "missing.com")],
+                params=[
+                    ("domain", "www.example.com"),
+                    ("domain", "missing.com"),
+                    ("domain", "legacy.com"),
+                ],
             )
 
         body = response.json()
         self.assertEqual(response.status_code, 200)
         self.assertEqual(body["matched_count"], 1)
-        self.assertEqual(body["missing"], ["missing.com"])
+        self.assertEqual(body["missing"], ["legacy.com", "missing.com"])
         self.assertIn("example.com", body["matched"])
         self.assertEqual(body["matched"]["example.com"]["overlay_summary"], {"ok": True})
+        self.assertEqual(
+            body["matched"]["example.com"]["retention"],
+            sample_analysis_payload()["retention"],
+        )
+
+    def test_tos_processor_get_returns_last_fetched_pages_from_valkey(self) -> None:
+        fake_client = FakeRedis()
+
+        with api_client() as client, patch.object(
+            tos_router_module, "get_client", return_value=fake_client
+        ):
+            empty = client.get("/api/tos_processor/")
+            fake_client.values["tos:pages:last"] = b'{"https://example.com":"text"}'
+            stored = client.get("/api/tos_processor/")
+
+        self.assertEqual(empty.json(), {})
+        self.assertEqual(stored.json(), {"https://example.com": "text"})
+
+    def test_tos_processor_skips_extraction_locked_by_another_worker(self) -> None:
+        with api_client() as client, patch.object(
+            tos_router_module, "get_json_raw", return_value=None
+        ), patch.object(
+            tos_router_module, "get_domain", return_value="example.com"
+        ), patch.object(
+            tos_router_module, "acquire_lock", return_value=None
+        ), patch.object(tos_router_module.asyncio, "create_task") as create_task:
+            response = client.post(
+                "/api/tos_processor/", json=["https://example.com/privacy"]
+            )
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()["status"], "processing")
+        create_task.assert_not_called()
+        self.assertNotIn("tos:process:example.com", tos_router_module._processing_cache_keys)
 
     def test_tos_processor_process_endpoint_returns_processing_and_cached_payload(
         self,
@@ -163,10 +242,12 @@ class ApiRouteTests(unittest.TestCase):
             return object()
 
         with api_client() as client, patch.object(
-            tos_router_module, "get_json", return_value=None
+            tos_router_module, "get_json_raw", return_value=None
         ), patch.object(
             tos_router_module, "get_domain", return_value="example.com"
         ), patch.object(
+            tos_router_module, "acquire_lock", return_value="token"
+        ) as acquire, patch.object(
             tos_router_module.asyncio,
             "create_task",
             side_effect=fake_create_task,
@@ -176,21 +257,33 @@ class ApiRouteTests(unittest.TestCase):
         self.assertEqual(miss_response.status_code, 202)
         self.assertEqual(miss_response.json()["status"], "processing")
         self.assertEqual(create_task.call_count, 1)
+        self.assertEqual(acquire.call_args.args[0], "tos:process:example.com:lock")
 
         with api_client() as client, patch.object(
             tos_router_module,
-            "get_json",
-            return_value=DummyCachedModel({"result": "cached"}),
+            "get_json_raw",
+            return_value=orjson.dumps(sample_analysis_payload()),
         ), patch.object(
             tos_router_module, "get_domain", return_value="example.com"
-        ), patch.object(
-            tos_router_module,
-            "_enrich_with_top_risks",
-            return_value={"result": "cached", "overlay_summary": {"ok": True}},
+        ), patch(
+            "app.api.overlay_summary.top_risks_json", return_value=b'{"ok":true}'
         ):
             hit_response = client.get("/api/tos_processor/process", params={"url": url})
 
         self.assertEqual(hit_response.status_code, 200)
         self.assertEqual(
-            hit_response.json(), {"result": "cached", "overlay_summary": {"ok": True}}
+            hit_response.json(),
+            {**sample_analysis_payload(), "overlay_summary": {"ok": True}},
         )
+
+        # A value /kv wrote under the cache key that is not an analysis is a miss.
+        with api_client() as client, patch.object(
+            tos_router_module, "get_json_raw", return_value=b"{}"
+        ), patch.object(
+            tos_router_module, "get_domain", return_value="example.com"
+        ), patch.object(
+            tos_router_module, "acquire_lock", return_value=None
+        ):
+            invalid_response = client.get("/api/tos_processor/process", params={"url": url})
+
+        self.assertEqual(invalid_response.status_code, 202)
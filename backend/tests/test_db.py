@@ -15,27 +15,61 @@ class DbTests(unittest.TestCase):
     def test_connect_uses_settings_and_close_resets_client(self) -> None:
         fake_client = FakeRedis()
         settings = SimpleNamespace(
-            valkey_host="127.0.0.1", valkey_port=6380, valkey_password="secret"
+            valkey_host="127.0.0.1",
+            valkey_port=6380,
+            valkey_password="secret",
+            valkey_max_connections=16,
+            valkey_unix_socket="",
+            valkey_health_check_interval=30,
         )
 
         with patch("app.db.get_settings", return_value=settings), patch(
-            "app.db.Redis", return_value=fake_client
-        ) as redis_cls:
+            "app.db.ConnectionPool"
+        ) as pool_cls, patch("app.db.Redis", return_value=fake_client) as redis_cls:
             db.connect()
 
-            redis_cls.assert_called_once_with(
+            pool_cls.assert_called_once_with(
                 host="127.0.0.1",
                 port=6380,
+                socket_keepalive=True,
                 password="secret",
+                max_connections=16,
+                health_check_interval=30,
                 decode_responses=False,
             )
+            redis_cls.assert_called_once_with(connection_pool=pool_cls.return_value)
             self.assertIs(db.get_client(), fake_client)
 
             db.close()
 
         self.assertTrue(fake_client.closed)
+        self.assertTrue(fake_client.connection_pool.disconnected)
         self.assertIsNone(db._client)
 
+    def test_connect_prefers_unix_socket_when_configured(self) -> None:
+        settings = SimpleNamespace(
+            valkey_host="127.0.0.1",
+            valkey_port=6379,
+            valkey_password="",
+            valkey_max_connections=64,
+            valkey_unix_socket="/run/valkey/valkey.sock",
+            valkey_health_check_interval=30,
+        )
+
+        with patch("app.db.get_settings", return_value=settings), patch(
+            "app.db.ConnectionPool"
+        ) as pool_cls, patch("app.db.Redis", return_value=FakeRedis()):
+            db.connect()
+
+        pool_cls.assert_called_once_with(
+            connection_class=db.UnixDomainSocketConnection,
+            path="/run/valkey/valkey.sock",
+            password=None,
+            max_connections=64,
+            health_check_interval=30,
+            decode_responses=False,
+        )
+
     def test_get_client_requires_connect(self) -> None:
         with self.assertRaisesRegex(RuntimeError, "Valkey not connected"):
             db.get_client()
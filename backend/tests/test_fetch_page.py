@@ -0,0 +1,400 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import stat
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import httpx
+
+from app.core.config import Settings
+from app.utils import fetch_page
+
+# setUp points the module at a temp dir; keep the real resolver for the settings test.
+_BROWSER_STATE_DIR = fetch_page._browser_state_dir
+
+
+class _FakeLocator:
+    def __init__(self, visible: bool = False) -> None:
+        self.first = self
+        self.visible = visible
+        self.clicked = False
+
+    async def is_visible(self) -> bool:
+        return self.visible
+
+    async def click(self, **_: object) -> None:
+        self.clicked = True
+
+
+class _FakePage:
+    def __init__(self, url_log: list[str], consent_button: bool = False) -> None:
+        self.url_log = url_log
+        self.waits: list[str] = []
+        self.consent_locator = _FakeLocator(consent_button)
+
+    async def goto(self, url: str, **_: object) -> None:
+        self.url_log.append(url)
+
+    async def wait_for_load_state(self, state: str, **_: object) -> None:
+        self.waits.append(state)
+
+    async def wait_for_function(self, expression: str, **_: object) -> None:
+        self.waits.append("text")
+
+    def get_by_role(self, role: str, **_: object) -> _FakeLocator:
+        return self.consent_locator
+
+    async def content(self) -> str:
+        return f"<p>{self.url_log[-1]}</p>"
+
+
+class _FakeContext:
+    def __init__(self, url_log: list[str]) -> None:
+        self.url_log = url_log
+        self.closed = False
+        self.routes: list[tuple[str, object]] = []
+        self.storage_state_arg: object = None
+
+    async def storage_state(self) -> dict[str, object]:
+        return {"cookies": [{"name": "consent", "value": "yes"}], "origins": []}
+
+    async def route(self, pattern: str, handler: object) -> None:
+        self.routes.append((pattern, handler))
+
+    async def new_page(self) -> _FakePage:
+        return _FakePage(self.url_log)
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+class _FakeBrowser:
+    def __init__(self) -> None:
+        self.connected = True
+        self.closed = False
+        self.contexts: list[_FakeContext] = []
+        self.urls: list[str] = []
+
+    def is_connected(self) -> bool:
+        return self.connected
+
+    async def new_context(self, *, storage_state: object = None) -> _FakeContext:
+        context = _FakeContext(self.urls)
+        context.storage_state_arg = storage_state
+        self.contexts.append(context)
+        return context
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+class _FakePlaywright:
+    def __init__(self) -> None:
+        self.launched: list[_FakeBrowser] = []
+        self.stopped = False
+        self.chromium = self
+
+    async def launch(self, **_: object) -> _FakeBrowser:
+        browser = _FakeBrowser()
+        self.launched.append(browser)
+        return browser
+
+    async def stop(self) -> None:
+        self.stopped = True
+
+
+_POLICY_HTML = (
+    b"<html><body>" + b"<p>We collect your email address.</p>" * 30 + b"</body></html>"
+)
+
+
+class FetchPageTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        state_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(state_dir.cleanup)
+        self.state_dir = Path(state_dir.name)
+        for name, value in (
+            ("_browser_domains", set()),
+            ("_browser_state_dir", lambda: self.state_dir),
+        ):
+            patcher = patch.object(fetch_page, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_html_to_text_drops_non_visible_elements(self) -> None:
+        html = (
+            "<html><head><title>Tab</title><style>p{}</style></head><body><p>Hello</p>\n"
+            "<script>x()</script><template><p>later</p></template><p>world</p></body></html>"
+        )
+
+        self.assertEqual(fetch_page.html_to_text(html), "Hello world")
+
+    def test_html_to_text_handles_comments_declarations_and_empty_input(self) -> None:
+        html = '<?xml version="1.0" encoding="utf-8"?><p>caf\u00e9 <!-- note --><b>&amp;</b>more</p><svg><text>x</text></svg>'
+
+        self.assertEqual(fetch_page.html_to_text(html), "caf\u00e9 & more")
+        self.assertEqual(fetch_page.html_to_text(html.encode("utf-8")), "caf\u00e9 & more")
+        self.assertEqual(fetch_page.html_to_text("<!-- only a comment -->"), "")
+        self.assertEqual(fetch_page.html_to_text("  "), "")
+
+    async def test_fetch_pages_content_runs_concurrently_and_keeps_order(self) -> None:
+        in_flight = 0
+        peak = 0
+        clients: set[int] = set()
+
+        async def fake_fetch(url: str, *, client: object = None) -> str:
+            nonlocal in_flight, peak
+            clients.add(id(client))
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return f"<p>{url}</p>"
+
+        urls = [f"https://example.com/{i}" for i in range(5)]
+        with patch.object(fetch_page, "_fetch_with_httpx", side_effect=fake_fetch):
+            result = await fetch_page.fetch_pages_content(
+                urls, use_browser=False, concurrency=2
+            )
+
+        self.assertEqual(result, urls)
+        self.assertEqual(peak, 2)
+        self.assertEqual(len(clients), 1)
+
+    async def test_fetch_with_httpx_streams_body(self) -> None:
+        transport = httpx.MockTransport(
+            lambda request: httpx.Response(200, text="<p>caf\u00e9</p>")
+        )
+        async with httpx.AsyncClient(transport=transport) as client:
+            html = await fetch_page._fetch_with_httpx("https://example.com", client=client)
+
+        self.assertEqual(html, "<p>caf\u00e9</p>".encode("utf-8"))
+
+    async def test_fetch_with_httpx_transcodes_declared_charsets_to_utf8(self) -> None:
+        transport = httpx.MockTransport(
+            lambda request: httpx.Response(
+                200,
+                content="<p>caf\u00e9</p>".encode("latin-1"),
+                headers={"content-type": "text/html; charset=iso-8859-1"},
+            )
+        )
+        async with httpx.AsyncClient(transport=transport) as client:
+            html = await fetch_page._fetch_with_httpx("https://example.com", client=client)
+
+        self.assertEqual(fetch_page.html_to_text(html), "caf\u00e9")
+
+    async def test_fetch_with_httpx_rejects_oversized_pages(self) -> None:
+        async def chunks():
+            for _ in range(4):
+                yield b"x" * 64
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            # Chunked body without a Content-Length, so the cap applies while streaming.
+            return httpx.Response(200, content=chunks())
+
+        transport = httpx.MockTransport(handler)
+        with patch.object(fetch_page, "MAX_PAGE_BYTES", 100):
+            async with httpx.AsyncClient(transport=transport) as client:
+                with self.assertRaises(fetch_page.PageTooLargeError):
+                    await fetch_page._fetch_with_httpx("https://example.com", client=client)
+
+    async def test_fetch_with_httpx_uses_shared_client_when_open(self) -> None:
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, text="<p>ok</p>"))
+        shared = httpx.AsyncClient(transport=transport)
+
+        with patch.object(fetch_page, "_http_client", shared):
+            html = await fetch_page._fetch_with_httpx("https://example.com")
+
+        self.assertEqual(html, b"<p>ok</p>")
+        self.assertFalse(shared.is_closed)
+        await shared.aclose()
+
+    async def test_open_and_close_http_client(self) -> None:
+        fetch_page.open_http_client()
+        client = fetch_page._http_client
+        fetch_page.open_http_client()
+
+        self.assertIs(fetch_page._http_client, client)
+        self.assertIn("Mozilla/5.0", client.headers["user-agent"])
+
+        await fetch_page.close_http_client()
+
+        self.assertTrue(client.is_closed)
+        self.assertIsNone(fetch_page._http_client)
+
+    async def test_shared_browser_is_reused_and_relaunched_after_a_crash(self) -> None:
+        playwright = _FakePlaywright()
+        starter = unittest.mock.Mock()
+        starter.return_value.start = unittest.mock.AsyncMock(return_value=playwright)
+
+        static_fetch = unittest.mock.AsyncMock(return_value=b"<p>short</p>")
+        with patch.object(fetch_page, "async_playwright", starter), patch.object(
+            fetch_page, "_fetch_with_httpx", static_fetch
+        ):
+            texts = await fetch_page.fetch_pages_content(
+                ["https://example.com/a", "https://example.com/b"]
+            )
+            first = playwright.launched[0]
+            first.connected = False
+            await fetch_page.fetch_page_content("https://example.com/c")
+            await fetch_page.close_browser()
+
+        self.assertEqual(texts, ["https://example.com/a", "https://example.com/b"])
+        self.assertEqual(starter.call_count, 1)
+        self.assertEqual(len(playwright.launched), 2)
+        self.assertEqual(len(first.contexts), 2)
+        self.assertTrue(all(context.closed for context in first.contexts))
+        self.assertEqual(
+            first.contexts[0].routes, [("**/*", fetch_page._block_unused_resources)]
+        )
+        self.assertTrue(playwright.launched[1].closed)
+        self.assertTrue(playwright.stopped)
+        self.assertIsNone(fetch_page._browser)
+        self.assertIsNone(fetch_page._playwright)
+
+    async def test_browser_aborts_images_fonts_media_and_stylesheets(self) -> None:
+        outcomes = {}
+        for resource_type in ("document", "script", "xhr", "image", "font", "media", "stylesheet"):
+            route = unittest.mock.Mock()
+            route.request.resource_type = resource_type
+            route.abort = unittest.mock.AsyncMock()
+            route.continue_ = unittest.mock.AsyncMock()
+            await fetch_page._block_unused_resources(route)
+            outcomes[resource_type] = route.abort.await_count == 1
+
+        self.assertEqual(
+            outcomes,
+            {
+                "document": False,
+                "script": False,
+                "xhr": False,
+                "image": True,
+                "font": True,
+                "media": True,
+                "stylesheet": True,
+            },
+        )
+
+    async def test_static_pages_skip_the_browser(self) -> None:
+        static_fetch = unittest.mock.AsyncMock(return_value=_POLICY_HTML)
+        rendered_fetch = unittest.mock.AsyncMock()
+
+        with patch.object(fetch_page, "_fetch_with_httpx", static_fetch), patch.object(
+            fetch_page, "_fetch_with_browser", rendered_fetch
+        ):
+            text = await fetch_page.fetch_page_content("https://example.com/privacy")
+
+        self.assertTrue(text.startswith("We collect your email address."))
+        rendered_fetch.assert_not_awaited()
+        self.assertEqual(fetch_page._browser_domains, set())
+
+    async def test_client_rendered_pages_use_the_browser_and_remember_the_domain(self) -> None:
+        shell = b'<html><body><div id="root"></div>' + _POLICY_HTML[12:]
+        static_fetch = unittest.mock.AsyncMock(return_value=shell)
+        rendered_fetch = unittest.mock.AsyncMock(return_value="<p>Rendered policy</p>")
+
+        with patch.object(fetch_page, "_fetch_with_httpx", static_fetch), patch.object(
+            fetch_page, "_fetch_with_browser", rendered_fetch
+        ):
+            first = await fetch_page.fetch_page_content("https://www.example.com/privacy")
+            second = await fetch_page.fetch_page_content("https://legal.example.com/terms")
+
+        self.assertEqual([first, second], ["Rendered policy", "Rendered policy"])
+        self.assertEqual(static_fetch.await_count, 1)
+        self.assertEqual(rendered_fetch.await_count, 2)
+        self.assertEqual(fetch_page._browser_domains, {"example.com"})
+
+    async def test_static_fetch_connection_errors_fall_back_without_remembering(self) -> None:
+        static_fetch = unittest.mock.AsyncMock(side_effect=httpx.ConnectTimeout("slow"))
+        rendered_fetch = unittest.mock.AsyncMock(return_value="<p>Rendered policy</p>")
+
+        with patch.object(fetch_page, "_fetch_with_httpx", static_fetch), patch.object(
+            fetch_page, "_fetch_with_browser", rendered_fetch
+        ):
+            text = await fetch_page.fetch_page_content("https://example.com/privacy")
+
+        self.assertEqual(text, "Rendered policy")
+        self.assertEqual(fetch_page._browser_domains, set())
+
+    async def test_render_waits_for_load_then_text_and_tolerates_timeouts(self) -> None:
+        url_log: list[str] = []
+        page = _FakePage(url_log)
+        context = unittest.mock.Mock()
+        context.new_page = unittest.mock.AsyncMock(return_value=page)
+
+        html = await fetch_page._render_page(context, "https://example.com/a")
+
+        self.assertEqual(html, "<p>https://example.com/a</p>")
+        self.assertEqual(page.waits, ["load", "text"])
+
+        slow_page = _FakePage(url_log)
+        slow_page.wait_for_function = unittest.mock.AsyncMock(
+            side_effect=fetch_page.PlaywrightTimeoutError("still loading")
+        )
+        context.new_page = unittest.mock.AsyncMock(return_value=slow_page)
+
+        html = await fetch_page._render_page(context, "https://example.com/b")
+
+        self.assertEqual(html, "<p>https://example.com/b</p>")
+
+    async def test_render_waits_again_after_clicking_a_consent_button(self) -> None:
+        page = _FakePage([], consent_button=True)
+        context = unittest.mock.Mock()
+        context.new_page = unittest.mock.AsyncMock(return_value=page)
+
+        await fetch_page._render_page(context, "https://example.com/a")
+
+        self.assertTrue(page.consent_locator.clicked)
+        self.assertEqual(page.waits, ["load", "text", "load", "text"])
+
+    async def test_browser_state_is_saved_and_reused_per_domain(self) -> None:
+        browser = _FakeBrowser()
+
+        await fetch_page._fetch_with_browser("https://www.example.com/privacy", browser=browser)
+        await fetch_page._fetch_with_browser("https://legal.example.com/terms", browser=browser)
+        await fetch_page._fetch_with_browser("https://other.org/terms", browser=browser)
+
+        state_file = self.state_dir / "example.com.json"
+        self.assertEqual(
+            [context.storage_state_arg for context in browser.contexts],
+            [None, state_file, None],
+        )
+        self.assertEqual(
+            json.loads(state_file.read_bytes())["cookies"][0]["name"], "consent"
+        )
+        self.assertEqual(
+            sorted(path.name for path in self.state_dir.iterdir()),
+            ["example.com.json", "other.org.json"],
+        )
+        self.assertIsNone(fetch_page._storage_state_path("file:///etc/passwd"))
+
+    async def test_visible_consent_button_is_clicked(self) -> None:
+        page = unittest.mock.Mock()
+        for visible in (True, False):
+            locator = _FakeLocator(visible)
+            page.get_by_role.return_value = locator
+
+            clicked = await fetch_page._dismiss_consent_banner(page)
+
+            self.assertEqual((clicked, locator.clicked), (visible, visible))
+
+    def test_browser_state_dir_is_absolute_and_private(self) -> None:
+        for configured, expected in (
+            ("state/pw", fetch_page._BACKEND_DIR / "state" / "pw"),
+            (str(self.state_dir), self.state_dir),
+            ("", None),
+        ):
+            with patch.object(
+                fetch_page, "get_settings", return_value=Settings(browser_state_dir=configured)
+            ):
+                self.assertEqual(_BROWSER_STATE_DIR(), expected)
+
+        state_file = self.state_dir / "pw_state" / "example.com.json"
+        fetch_page._write_file_atomically(state_file, b"{}")
+
+        self.assertEqual(stat.S_IMODE(state_file.parent.stat().st_mode), 0o700)
+        self.assertEqual(stat.S_IMODE(state_file.stat().st_mode), 0o600)
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import asyncio
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from app.utils import gemini
+
+
+class _FakeModel:
+    def __init__(self) -> None:
+        self.in_flight = 0
+        self.peak = 0
+        self.sync_calls: list[str] = []
+
+    def generate_content(self, prompt: str) -> SimpleNamespace:
+        self.sync_calls.append(prompt)
+        return SimpleNamespace(text=f"sync:{prompt}")
+
+    async def generate_content_async(self, prompt: str) -> SimpleNamespace:
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return SimpleNamespace(text=f"async:{prompt}")
+
+
+class GeminiClientTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.model = _FakeModel()
+        with patch.object(gemini.genai, "configure"), patch.object(
+            gemini.genai, "GenerativeModel", return_value=self.model
+        ):
+            self.client = gemini.GeminiClient("key", max_cache_entries=2)
+
+    async def test_generate_many_is_bounded_and_keeps_order(self) -> None:
+        prompts = [f"p{i}" for i in range(5)]
+
+        result = await self.client.generate_many(prompts, concurrency=2)
+
+        self.assertEqual(result, [f"async:{p}" for p in prompts])
+        self.assertEqual(self.model.peak, 2)
+        self.assertEqual(self.client.generate("p"), "sync:p")
+
+    def test_repeated_prompts_are_served_from_a_bounded_lru(self) -> None:
+        for prompt in ("a", "b", "a", "c", "a", "b"):
+            self.client.generate(prompt)
+
+        # "b" was evicted by "c" (capacity 2) while "a" stayed recently used.
+        self.assertEqual(self.model.sync_calls, ["a", "b", "c", "b"])
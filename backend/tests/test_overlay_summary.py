@@ -3,28 +3,105 @@ from __future__ import annotations
 import unittest
 from unittest.mock import patch
 
+import orjson
+
+from app import severity_store
 from app.api import overlay_summary
-from tests.fakes import DummyCachedModel, sample_analysis_payload
+from tests.fakes import FakeRedis, sample_policy_analysis
 
 
 class OverlaySummaryTests(unittest.TestCase):
-    def test_compute_top_risks_deduplicates_sections_and_enriches_output(self) -> None:
-        site_attributes = [
-            {"attribute": "government_id", "color": "red", "sensitivity_level": 9},
-            {"attribute": "email", "color": "red", "sensitivity_level": 4},
-            {"attribute": "fingerprint", "color": "red", "sensitivity_level": 13},
-            {"attribute": "health", "color": "red", "sensitivity_level": 3},
-            {"attribute": "analytics", "color": "green", "sensitivity_level": 1},
-        ]
+    def setUp(self) -> None:
+        overlay_summary._analysis_cache.clear()
+        overlay_summary._normalize_domain.cache_clear()
 
-        with patch(
-            "app.api.overlay_summary.get_site_attributes", return_value=site_attributes
-        ), patch(
-            "app.api.overlay_summary.get_json",
-            return_value=DummyCachedModel(sample_analysis_payload()),
+    def test_store_overlay_payload_writes_serialized_summary(self) -> None:
+        fake_client = FakeRedis()
+        payload = {"domain": "example.com", "top_high_risk_attributes": []}
+
+        with patch("app.api.overlay_summary.get_client", return_value=fake_client), patch(
+            "app.api.overlay_summary.get_domain", return_value="example.com"
         ), patch(
+            "app.api.overlay_summary.compute_top_risks", return_value=payload
+        ) as compute:
+            overlay_summary.store_overlay_payload("www.example.com")
+            stored = overlay_summary._get_stored_overlay_payload("example.com")
+
+        compute.assert_called_once_with("example.com", analysis_key=None)
+        self.assertEqual(orjson.loads(stored), payload)
+
+    def test_store_overlay_payload_reads_evidence_from_the_given_analysis_key(self) -> None:
+        fake_client = FakeRedis()
+        # A multi-domain request cached its analysis under the combined key only.
+        fake_client.values["tos:process:example.com|example.org"] = (
+            sample_policy_analysis().model_dump_json().encode("utf-8")
+        )
+
+        with patch("app.severity_store.get_client", return_value=fake_client), patch(
+            "app.api.overlay_summary.get_client", return_value=fake_client
+        ):
+            severity_store.set_site_attributes("example.org", ["health"])
+            overlay_summary.store_overlay_payload(
+                "example.org", "tos:process:example.com|example.org"
+            )
+            payload = orjson.loads(overlay_summary.top_risks_json("example.org"))
+
+        self.assertTrue(payload["has_cached_analysis"])
+        self.assertEqual(
+            payload["top_high_risk_attributes"][0]["evidence"],
+            "We infer health-related information.",
+        )
+        self.assertEqual(overlay_summary._analysis_cache, {})
+
+    def test_reseeding_the_severity_map_replaces_the_stored_overlay(self) -> None:
+        fake_client = FakeRedis()
+        fake_client.values["tos:process:example.com"] = (
+            sample_policy_analysis().model_dump_json().encode("utf-8")
+        )
+
+        def top_titles() -> list[str]:
+            payload = orjson.loads(overlay_summary.top_risks_json("example.com"))
+            return [item["title"] for item in payload["top_high_risk_attributes"]]
+
+        with patch("app.severity_store.get_client", return_value=fake_client), patch(
+            "app.api.overlay_summary.get_client", return_value=fake_client
+        ):
+            severity_store.set_attribute_severity_map(severity_store.DEFAULT_ATTRIBUTE_SEVERITY)
+            severity_store.set_site_attributes("example.com", ["email", "health", "advertisers"])
+            overlay_summary.store_overlay_payload("example.com")
+            before = top_titles()
+            severity_store.set_attribute_severity_map({
+                **severity_store.DEFAULT_ATTRIBUTE_SEVERITY,
+                "advertisers": {"color": "red", "sensitivity_level": 30},
+            })
+            after = top_titles()
+
+        self.assertEqual(before, ["Health"])
+        self.assertEqual(after, ["Advertisers", "Health"])
+        self.assertNotIn("tos:overlay:example.com", fake_client.values)
+
+    def test_compute_top_risks_deduplicates_sections_and_enriches_output(self) -> None:
+        fake_client = FakeRedis()
+        fake_client.values["tos:process:example.com"] = (
+            sample_policy_analysis().model_dump_json().encode("utf-8")
+        )
+
+        with patch("app.severity_store.get_client", return_value=fake_client), patch(
             "app.api.overlay_summary.get_domain", return_value="example.com"
         ):
+            severity_store.set_attribute_severity_map(
+                {
+                    "government_id": {"color": "red", "sensitivity_level": 9},
+                    "email": {"color": "red", "sensitivity_level": 4},
+                    "fingerprint": {"color": "red", "sensitivity_level": 13},
+                    "health": {"color": "red", "sensitivity_level": 3},
+                    "analytics": {"color": "green", "sensitivity_level": 1},
+                }
+            )
+            severity_store.set_site_attributes(
+                "example.com",
+                ["government_id", "email", "fingerprint", "health", "analytics"],
+            )
             result = overlay_summary.compute_top_risks(
                 "https://www.example.com/signup"
             )
@@ -33,10 +110,10 @@ class OverlaySummaryTests(unittest.TestCase):
         self.assertTrue(result["has_cached_analysis"])
         self.assertEqual(
             [item["title"] for item in result["top_high_risk_attributes"]],
-            ["Government Id", "Fingerprint", "Health"],
+            ["Fingerprint", "Government Id", "Health"],
         )
         self.assertEqual(
-            result["top_high_risk_attributes"][0]["evidence"],
+            result["top_high_risk_attributes"][1]["evidence"],
             "We collect government ID and email.",
         )
         self.assertEqual(
@@ -45,16 +122,17 @@ class OverlaySummaryTests(unittest.TestCase):
         )
         self.assertEqual(
             [item["title"] for item in result["mitigations"]],
-            ["Government Id", "Fingerprint"],
+            ["Fingerprint", "Government Id"],
         )
 
     def test_compute_top_risks_handles_missing_cache(self) -> None:
         with patch(
-            "app.api.overlay_summary.get_site_attributes",
-            return_value=[
-                {"attribute": "health", "color": "red", "sensitivity_level": 3}
-            ],
-        ), patch("app.api.overlay_summary.get_json", return_value=None), patch(
+            "app.api.overlay_summary.get_overlay_bundle",
+            return_value=(
+                [{"attribute": "health", "color": "red", "sensitivity_level": 3}],
+                [None, None],
+            ),
+        ), patch(
             "app.api.overlay_summary.get_domain", return_value="example.co.uk"
         ):
             result = overlay_summary.compute_top_risks("subdomain.example.co.uk")
@@ -66,3 +144,99 @@ class OverlaySummaryTests(unittest.TestCase):
         )
         self.assertEqual(result["data_retention_policy"]["explanation"], "")
         self.assertEqual(result["mitigations"][0]["mitigation"], "")
+
+    def test_cached_analysis_is_memoized_until_invalidated_by_any_worker(self) -> None:
+        fake_client = FakeRedis()
+        fake_client.values["tos:process:example.com"] = (
+            sample_policy_analysis().model_dump_json().encode("utf-8")
+        )
+        get_bundle = patch(
+            "app.api.overlay_summary.get_overlay_bundle",
+            wraps=overlay_summary.get_overlay_bundle,
+        )
+
+        with patch("app.severity_store.get_client", return_value=fake_client), patch(
+            "app.api.overlay_summary.get_client", return_value=fake_client
+        ), get_bundle as get_bundle:
+            _, first = overlay_summary._load_overlay_inputs("example.com")
+            _, second = overlay_summary._load_overlay_inputs("example.com")
+            overlay_summary.invalidate_cached_analysis("example.com")
+            _, third = overlay_summary._load_overlay_inputs("example.com")
+            # Another worker rewrote the analysis: only the shared generation changes.
+            fake_client.incr("tos:process:example.com:gen")
+            _, fourth = overlay_summary._load_overlay_inputs("example.com")
+            _, fifth = overlay_summary._load_overlay_inputs("example.com")
+
+        self.assertIs(first, second)
+        self.assertIsNot(first, third)
+        self.assertIsNot(third, fourth)
+        self.assertIs(fourth, fifth)
+        full_read = ("example.com", "tos:process:example.com:gen", "tos:process:example.com")
+        generation_read = ("example.com", "tos:process:example.com:gen")
+        self.assertEqual(
+            [call.args for call in get_bundle.call_args_list],
+            [
+                full_read,
+                generation_read,
+                full_read,
+                generation_read,
+                full_read,
+                generation_read,
+            ],
+        )
+
+    def test_cached_analysis_does_not_memoize_misses_or_invalid_payloads(
+        self,
+    ) -> None:
+        with patch(
+            "app.api.overlay_summary.get_overlay_bundle",
+            side_effect=[
+                ([], [None, None]),
+                ([], [None, b'{"not": "an analysis"}']),
+                ([], [None, None]),
+            ],
+        ) as get_bundle:
+            for _ in range(3):
+                _, analysis = overlay_summary._load_overlay_inputs("example.com")
+                self.assertIsNone(analysis)
+
+        self.assertEqual(get_bundle.call_count, 3)
+        self.assertEqual(overlay_summary._analysis_cache, {})
+
+    def test_section_lookup_uses_attribute_section_map(self) -> None:
+        analysis = sample_policy_analysis()
+
+        self.assertIs(
+            overlay_summary._get_section_for_attribute("ip_address", analysis),
+            analysis.data_collection.ip_address,
+        )
+        self.assertIs(
+            overlay_summary._get_section_for_attribute("biometric", analysis),
+            analysis.data_collection.sensitive_data,
+        )
+        self.assertIsNone(
+            overlay_summary._get_section_for_attribute("model_fields", analysis)
+        )
+
+    def test_get_fields_for_attribute_returns_all_three_fields(self) -> None:
+        analysis = sample_policy_analysis()
+
+        self.assertEqual(
+            overlay_summary._get_fields_for_attribute("precise_gps", analysis),
+            (
+                "We collect precise GPS coordinates.",
+                "Precise location exposes real-world movements.",
+                "Disable location access unless it is essential.",
+            ),
+        )
+        self.assertEqual(
+            overlay_summary._get_fields_for_attribute("email", None), ("", "", "")
+        )
+
+    def test_format_attribute_name_covers_known_and_unknown_attributes(self) -> None:
+        self.assertEqual(
+            overlay_summary._format_attribute_name("age_13_to_17"), "Age 13 To 17"
+        )
+        self.assertEqual(
+            overlay_summary._format_attribute_name("custom_field"), "Custom Field"
+        )
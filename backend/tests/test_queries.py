@@ -3,7 +3,13 @@ from __future__ import annotations
 import unittest
 from unittest.mock import patch
 
-from app.queries import get_json, set_json
+from app.queries import (
+    acquire_lock,
+    get_json,
+    get_json_raw_many,
+    release_lock,
+    set_json,
+)
 from app.schemas.common import MessageResponse
 from tests.fakes import FakeRedis
 
@@ -37,3 +43,44 @@ class QueriesTests(unittest.TestCase):
             result = get_json("missing", MessageResponse)
 
         self.assertIsNone(result)
+
+    def test_acquire_lock_is_exclusive_until_released(self) -> None:
+        fake_client = FakeRedis()
+
+        with patch("app.queries.get_client", return_value=fake_client):
+            first = acquire_lock("job:lock", 300)
+            second = acquire_lock("job:lock", 300)
+            released = release_lock("job:lock", first)
+            third = acquire_lock("job:lock", 300)
+
+        self.assertIsNotNone(first)
+        self.assertIsNone(second)
+        self.assertTrue(released)
+        self.assertIsNotNone(third)
+        self.assertNotEqual(third, first)
+        self.assertEqual(fake_client.expiry["job:lock"], 300)
+
+    def test_release_lock_leaves_a_lock_reacquired_after_expiry(self) -> None:
+        fake_client = FakeRedis()
+
+        with patch("app.queries.get_client", return_value=fake_client):
+            first = acquire_lock("job:lock", 300)
+            fake_client.delete("job:lock")  # TTL ran out during a slow job
+            second = acquire_lock("job:lock", 300)
+            released_by_first = release_lock("job:lock", first)
+            still_held = acquire_lock("job:lock", 300)
+
+        self.assertFalse(released_by_first)
+        self.assertIsNone(still_held)
+        self.assertEqual(fake_client.values["job:lock"], second.encode("utf-8"))
+
+    def test_get_json_raw_many_returns_stored_bytes_in_order(self) -> None:
+        fake_client = FakeRedis()
+        fake_client.values["a"] = b'{"message":"first"}'
+
+        with patch("app.queries.get_client", return_value=fake_client):
+            results = get_json_raw_many(["missing", "a"])
+            empty = get_json_raw_many([])
+
+        self.assertEqual(results, [None, b'{"message":"first"}'])
+        self.assertEqual(empty, [])
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+import unittest
+from uuid import UUID
+
+import orjson
+
+from app.core.responses import dumps
+from app.schemas.common import MessageResponse
+
+
+class ResponsesTests(unittest.TestCase):
+    def test_dumps_handles_models_sets_and_native_types(self) -> None:
+        payload = {
+            "model": MessageResponse(message="hello"),
+            "tags": {"a"},
+            "at": datetime(2024, 1, 2, tzinfo=timezone.utc),
+            "id": UUID("12345678-1234-5678-1234-567812345678"),
+        }
+
+        result = orjson.loads(dumps(payload))
+
+        self.assertEqual(result["model"], {"message": "hello"})
+        self.assertEqual(result["tags"], ["a"])
+        self.assertEqual(result["at"], "2024-01-02T00:00:00+00:00")
+        self.assertEqual(result["id"], "12345678-1234-5678-1234-567812345678")
+
+    def test_dumps_rejects_unknown_types(self) -> None:
+        with self.assertRaises(TypeError):
+            dumps({"value": object()})
@@ -8,6 +8,9 @@ from tests.fakes import FakeRedis
 
 
 class SeverityStoreTests(unittest.TestCase):
+    def setUp(self) -> None:
+        severity_store.invalidate_severity_map_cache()
+
     def test_attribute_severity_round_trip(self) -> None:
         fake_client = FakeRedis()
         mapping = {
@@ -21,6 +24,42 @@ class SeverityStoreTests(unittest.TestCase):
 
         self.assertEqual(result, mapping)
 
+    def test_get_attribute_severity_map_is_cached_until_set(self) -> None:
+        fake_client = FakeRedis()
+        fake_client.hashes[severity_store.SEVERITY_KEY] = {
+            b"email": b'{"color": "yellow", "sensitivity_level": 4}',
+        }
+
+        with patch("app.severity_store.get_client", return_value=fake_client):
+            first = severity_store.get_attribute_severity_map()
+            fake_client.hashes[severity_store.SEVERITY_KEY] = {}
+            second = severity_store.get_attribute_severity_map()
+            severity_store.set_attribute_severity_map(
+                {"email": {"color": "red", "sensitivity_level": 7}}
+            )
+            third = severity_store.get_attribute_severity_map()
+
+        self.assertIs(second, first)
+        self.assertEqual(third, {"email": {"color": "red", "sensitivity_level": 7}})
+
+    def test_uncached_severity_map_read_sees_a_reseed_by_another_worker(self) -> None:
+        fake_client = FakeRedis()
+        fake_client.hashes[severity_store.SEVERITY_KEY] = {
+            b"email": b'{"color": "yellow", "sensitivity_level": 4}',
+        }
+
+        with patch("app.severity_store.get_client", return_value=fake_client):
+            severity_store.get_attribute_severity_map()
+            # Another worker re-seeds; this worker's memo is not cleared.
+            fake_client.hashes[severity_store.SEVERITY_KEY] = {
+                b"email": b'{"color": "red", "sensitivity_level": 7}',
+            }
+            severity_store.set_site_attributes("example.com", ["email"])
+
+        self.assertEqual(
+            fake_client.sorted_sets["tos:red_attrs:example.com"], {b"email": 7.0}
+        )
+
     def test_get_attribute_severity_map_normalizes_legacy_values(self) -> None:
         fake_client = FakeRedis()
         fake_client.hashes[severity_store.SEVERITY_KEY] = {
@@ -55,6 +94,168 @@ class SeverityStoreTests(unittest.TestCase):
         self.assertEqual(result[1]["color"], "yellow")
         self.assertEqual(result[2]["color"], "green")
 
+    def test_set_site_attributes_stores_top_red_attribute_per_section(self) -> None:
+        fake_client = FakeRedis()
+
+        with patch("app.severity_store.get_client", return_value=fake_client):
+            severity_store.set_site_attributes(
+                "example.com",
+                ["physical_address", "government_id", "email", "fingerprint", "health"],
+            )
+            top, _ = severity_store.get_overlay_bundle("example.com")
+            top_two, _ = severity_store.get_overlay_bundle("example.com", n=2)
+
+        self.assertEqual(
+            fake_client.sorted_sets["tos:red_attrs:example.com"],
+            {b"fingerprint": 13.0, b"government_id": 9.0, b"health": 3.0},
+        )
+        self.assertEqual(
+            top,
+            [
+                {"attribute": "fingerprint", "color": "red", "sensitivity_level": 13},
+                {"attribute": "government_id", "color": "red", "sensitivity_level": 9},
+                {"attribute": "health", "color": "red", "sensitivity_level": 3},
+            ],
+        )
+        self.assertEqual(top_two, top[:2])
+
+    def test_set_attribute_severity_map_rebuilds_stored_site_attributes(self) -> None:
+        fake_client = FakeRedis()
+
+        with patch("app.severity_store.get_client", return_value=fake_client):
+            severity_store.set_site_attributes_many(
+                ["example.com", "www.example.com"], ["email", "government_id"]
+            )
+            severity_store.set_site_attributes("other.com", ["analytics"])
+            severity_store.set_attribute_severity_map({
+                **severity_store.DEFAULT_ATTRIBUTE_SEVERITY,
+                "email": {"color": "red", "sensitivity_level": 30},
+                "analytics": {"color": "red", "sensitivity_level": 2},
+            })
+            top, _ = severity_store.get_overlay_bundle("www.example.com")
+            other_top, _ = severity_store.get_overlay_bundle("other.com")
+
+        self.assertEqual(
+            fake_client.sorted_sets["tos:attrs:example.com"],
+            {b"email": 30.0, b"government_id": 9.0},
+        )
+        # email and government_id share a section type, so only the higher one is red.
+        self.assertEqual(
+            top, [{"attribute": "email", "color": "red", "sensitivity_level": 30}]
+        )
+        self.assertEqual(
+            other_top, [{"attribute": "analytics", "color": "red", "sensitivity_level": 2}]
+        )
+
+    def test_sensitivity_levels_merge_map_over_defaults_and_memoize(self) -> None:
+        severity_map = {
+            "email": {"color": "red", "sensitivity_level": 7},
+            "custom": {"color": "red"},
+        }
+
+        levels = severity_store._sensitivity_levels(severity_map)
+
+        self.assertEqual(levels["email"], 7.0)
+        self.assertEqual(levels["custom"], 1.0)
+        self.assertEqual(levels["government_id"], 9.0)
+        self.assertIs(severity_store._sensitivity_levels(severity_map), levels)
+        self.assertIsNot(severity_store._sensitivity_levels(dict(severity_map)), levels)
+
+    def test_set_site_attributes_many_writes_all_domains_in_one_pipeline(self) -> None:
+        fake_client = FakeRedis()
+        fake_client.sorted_sets["tos:attrs:www.example.com"] = {b"stale": 1.0}
+        pipelines = []
+        make_pipeline = fake_client.pipeline
+
+        def tracking_pipeline(transaction: bool = True) -> object:
+            pipe = make_pipeline(transaction)
+            pipelines.append(pipe)
+            return pipe
+
+        fake_client.pipeline = tracking_pipeline
+
+        with patch("app.severity_store.get_client", return_value=fake_client):
+            severity_store.set_site_attributes_many(
+                ["example.com", "www.example.com"],
+                ["email", "government_id"],
+                severity_store.DEFAULT_ATTRIBUTE_SEVERITY,
+            )
+
+        self.assertEqual(len(pipelines), 1)
+        self.assertTrue(pipelines[0].executed)
+        for domain in ("example.com", "www.example.com"):
+            self.assertEqual(
+                fake_client.sorted_sets[f"tos:attrs:{domain}"],
+                {b"email": 4.0, b"government_id": 9.0},
+            )
+            self.assertEqual(
+                fake_client.sorted_sets[f"tos:red_attrs:{domain}"],
+                {b"government_id": 9.0},
+            )
+
+    def test_get_overlay_bundle_reads_red_attributes_and_analysis_in_one_pipeline(
+        self,
+    ) -> None:
+        fake_client = FakeRedis()
+        fake_client.values["tos:process:example.com"] = b'{"cached": true}'
+        pipelines = []
+        make_pipeline = fake_client.pipeline
+
+        def tracking_pipeline(transaction: bool = True) -> object:
+            pipe = make_pipeline(transaction)
+            pipelines.append(pipe)
+            return pipe
+
+        with patch("app.severity_store.get_client", return_value=fake_client):
+            severity_store.set_site_attributes("example.com", ["email", "government_id"])
+            fake_client.pipeline = tracking_pipeline
+            attrs, (raw,) = severity_store.get_overlay_bundle(
+                "example.com", "tos:process:example.com"
+            )
+            missing_attrs, missing_values = severity_store.get_overlay_bundle("other.com")
+
+        self.assertEqual(
+            attrs,
+            [{"attribute": "government_id", "color": "red", "sensitivity_level": 9}],
+        )
+        self.assertEqual(raw, b'{"cached": true}')
+        self.assertEqual((missing_attrs, missing_values), ([], []))
+        self.assertEqual(len(pipelines), 2)
+        self.assertTrue(all(pipe.executed for pipe in pipelines))
+
+    def test_get_overlay_bundle_answers_domains_without_red_attributes_directly(
+        self,
+    ) -> None:
+        fake_client = FakeRedis()
+
+        with patch("app.severity_store.get_client", return_value=fake_client):
+            severity_store.set_site_attributes("green.com", ["analytics", "email"])
+            with patch.object(severity_store, "get_site_attributes") as full_list:
+                green_top, _ = severity_store.get_overlay_bundle("green.com")
+                unknown_top, _ = severity_store.get_overlay_bundle("unknown.com")
+
+        self.assertEqual(
+            fake_client.sorted_sets["tos:red_attrs:green.com"], {b"_none": 0.0}
+        )
+        self.assertEqual((green_top, unknown_top), ([], []))
+        full_list.assert_not_called()
+
+    def test_get_overlay_bundle_falls_back_for_domains_without_red_zset(self) -> None:
+        fake_client = FakeRedis()
+        fake_client.sorted_sets["tos:attrs:legacy.com"] = {
+            b"email": 4.0,
+            b"health": 3.0,
+            b"genetic": 1.0,
+        }
+
+        with patch("app.severity_store.get_client", return_value=fake_client):
+            attrs, _ = severity_store.get_overlay_bundle("legacy.com")
+
+        self.assertEqual(
+            attrs,
+            [{"attribute": "health", "color": "red", "sensitivity_level": 3}],
+        )
+
     def test_collect_attributes_from_data_collection_extracts_types_and_ip(self) -> None:
         data_collection = {
             "personal_identifiers": {"types": ["email", "name"]},
@@ -1,11 +1,18 @@
 from __future__ import annotations
 
+import ast
 import unittest
 
+from pydantic import ValidationError
+
+from app.api.tos_processor import models
 from app.api.tos_processor.models import (
     DeviceDataCollected,
     PersonalIdentifiersCollected,
+    PolicyAnalysis,
 )
+from app.api.tos_processor.models_fast import OVERLAY_ANALYSIS_DECODER
+from tests.fakes import sample_policy_analysis
 
 
 class TosProcessorModelTests(unittest.TestCase):
@@ -17,7 +24,7 @@ class TosProcessorModelTests(unittest.TestCase):
             mitigation="",
         )
 
-        self.assertEqual(model.types, ["email", "phone_number"])
+        self.assertEqual(model.types, ("email", "phone_number"))
 
     def test_device_data_types_drop_invalid_values(self) -> None:
         model = DeviceDataCollected(
@@ -27,4 +34,73 @@ class TosProcessorModelTests(unittest.TestCase):
             mitigation="",
         )
 
-        self.assertEqual(model.types, ["browser_info", "timezone"])
+        self.assertEqual(model.types, ("browser_info", "timezone"))
+
+    def test_policy_analysis_section_and_field_accessors(self) -> None:
+        analysis = sample_policy_analysis()
+
+        section = analysis.get_section("precise_location")
+
+        self.assertIs(section, analysis.data_collection.precise_location)
+        self.assertEqual(
+            section.get_field("evidence"), "We collect precise GPS coordinates."
+        )
+        self.assertEqual(
+            analysis.get_section("ip_address").get_field("mitigation"),
+            "Use a privacy-preserving network where appropriate.",
+        )
+        self.assertIsNone(analysis.get_section("model_dump"))
+
+    def test_overlay_view_matches_validated_analysis(self) -> None:
+        analysis = sample_policy_analysis()
+
+        view = OVERLAY_ANALYSIS_DECODER.decode(analysis.model_dump_json())
+
+        for key in ("precise_location", "ip_address", "sensitive_data"):
+            for field in ("evidence", "explanation", "mitigation"):
+                self.assertEqual(
+                    view.get_section(key).get_field(field),
+                    analysis.get_section(key).get_field(field),
+                )
+        self.assertEqual(
+            view.retention.retention_explanation,
+            analysis.retention.retention_explanation,
+        )
+        self.assertIsNone(view.get_section("model_dump"))
+
+    def test_policy_analysis_is_frozen_and_reuses_nested_instances(self) -> None:
+        analysis = sample_policy_analysis()
+
+        with self.assertRaises(ValidationError):
+            analysis.data_collection.ip_address.evidence = "changed"
+
+        rebuilt = PolicyAnalysis(**dict(analysis))
+        self.assertIs(rebuilt.data_collection, analysis.data_collection)
+
+    def test_models_module_defines_each_name_once(self) -> None:
+        with open(models.__file__, encoding="utf-8") as f:
+            tree = ast.parse(f.read())
+
+        names = [
+            node.name if isinstance(node, ast.ClassDef) else node.targets[0].id
+            for node in tree.body
+            if isinstance(node, ast.ClassDef)
+            or (isinstance(node, ast.Assign) and isinstance(node.targets[0], ast.Name))
+        ]
+
+        self.assertEqual(len(names), len(set(names)))
+
+    def test_empty_types_share_the_immutable_default(self) -> None:
+        first = PersonalIdentifiersCollected()
+        second = DeviceDataCollected(types=[])
+
+        self.assertEqual(first.types, ())
+        self.assertIs(first.types, second.types)
+
+    def test_types_schema_is_a_plain_enum_array_without_default(self) -> None:
+        # This schema is sent to the model as the structured-output tool definition.
+        schema = PersonalIdentifiersCollected.model_json_schema()["properties"]["types"]
+
+        self.assertNotIn("default", schema)
+        self.assertEqual(schema["type"], "array")
+        self.assertIn("email", schema["items"]["enum"])
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import unittest
+
+from app.api.tos_processor.chain import _format_policies
+from app.api.tos_processor.prompts import (
+    TOS_PRIVACY_EXTRACTION_PROMPT,
+    render_pages_prompt,
+    render_prompt,
+)
+
+
+class TosProcessorPromptTests(unittest.TestCase):
+    def test_render_prompt_matches_str_format(self) -> None:
+        policies = '--- Document 1 ---\nWe keep {"data"} for {policies} days.'
+
+        self.assertEqual(
+            render_prompt(policies),
+            TOS_PRIVACY_EXTRACTION_PROMPT.format(policies=policies),
+        )
+
+    def test_render_pages_prompt_matches_headed_documents(self) -> None:
+        pages = {
+            "https://example.com/privacy": "Privacy text",
+            "https://example.com/terms": "Terms text",
+            "https://example.com/empty": "",
+        }
+        headed = [f"Source: {url}\n\n{text}" for url, text in pages.items()]
+
+        self.assertEqual(
+            render_pages_prompt(pages), render_prompt(_format_policies(headed))
+        )
+        self.assertEqual(render_pages_prompt({}), render_prompt(_format_policies([])))
+
+    def test_prompt_lists_every_allowed_type_from_the_models(self) -> None:
+        from typing import get_args
+
+        from app.api.tos_processor.models import SensitiveCategoryType
+
+        self.assertIn(
+            "• sensitive_data.types: " + ", ".join(get_args(SensitiveCategoryType)),
+            TOS_PRIVACY_EXTRACTION_PROMPT,
+        )
+        self.assertNotIn("{allowed_types}", TOS_PRIVACY_EXTRACTION_PROMPT)
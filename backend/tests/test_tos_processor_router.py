@@ -2,6 +2,11 @@ from __future__ import annotations
 
 import importlib
 import unittest
+from unittest.mock import AsyncMock, patch
+
+import orjson
+
+from tests.fakes import FakeRedis, sample_policy_analysis
 
 tos_router = importlib.import_module("app.api.tos_processor.router")
 
@@ -11,11 +16,13 @@ class TosProcessorRouterTests(unittest.TestCase):
         with unittest.mock.patch.object(
             tos_router, "get_domain", return_value="google.com"
         ):
-            key = tos_router._cache_key_for_urls(
-                [
-                    "https://policies.google.com/privacy",
-                    "https://accounts.google.com/signup",
-                ]
+            key = tos_router._cache_key_for_domains(
+                tos_router._domains_for_urls(
+                    [
+                        "https://policies.google.com/privacy",
+                        "https://accounts.google.com/signup",
+                    ]
+                )
             )
 
         self.assertEqual(key, "tos:process:google.com")
@@ -35,18 +42,121 @@ class TosProcessorRouterTests(unittest.TestCase):
                 "linkedin.com",
             )
 
-    def test_policies_with_headings_formats_source_blocks(self) -> None:
-        result = tos_router._policies_with_headings(
-            {
-                "https://example.com/privacy": "  Privacy text  ",
-                "https://example.com/terms": "Terms text",
-            }
+    def test_content_key_ignores_order_but_not_domain(self) -> None:
+        content_key = tos_router._content_key_for_pages
+        key = content_key(["example.com"], ["Privacy text", "Terms text"])
+
+        self.assertTrue(key.startswith("tos:content:"))
+        self.assertEqual(key, content_key(["example.com"], ["Terms text", "Privacy text"]))
+        self.assertNotEqual(key, content_key(["example.com"], ["Privacy text"]))
+        self.assertNotEqual(key, content_key(["example.org"], ["Privacy text", "Terms text"]))
+        self.assertIsNone(content_key(["example.com"], ["", " \n"]))
+
+    def test_enrich_with_top_risks_splices_overlay_into_cached_json(self) -> None:
+        with patch(
+            "app.api.overlay_summary.top_risks_json", return_value=b'{"top_risks":[]}'
+        ) as top_risks:
+            enriched = tos_router._enrich_with_top_risks(
+                b'{"retention":{"status":"found"}}', ["example.com"]
+            )
+
+        top_risks.assert_called_once_with("example.com")
+        self.assertEqual(
+            orjson.loads(enriched),
+            {"retention": {"status": "found"}, "overlay_summary": {"top_risks": []}},
         )
 
+
+class TosProcessorBackgroundTests(unittest.IsolatedAsyncioTestCase):
+    def test_processing_lock_fails_open_with_a_warning_and_releases_by_token(self) -> None:
+        with patch.object(
+            tos_router, "acquire_lock", side_effect=ConnectionError("down")
+        ), self.assertLogs(tos_router.logger, "WARNING") as logs:
+            token = tos_router._acquire_processing_lock("tos:process:example.com")
+
+        self.assertEqual(token, "")
+        self.assertIn("proceeding without cross-worker dedup", logs.output[0])
+
+        with patch.object(tos_router, "release_lock", return_value=False) as release:
+            tos_router._release_processing_lock("tos:process:example.com", "")
+            release.assert_not_called()
+            with self.assertLogs(tos_router.logger, "WARNING"):
+                tos_router._release_processing_lock("tos:process:example.com", "abc")
+
+        release.assert_called_once_with("tos:process:example.com:lock", "abc")
+
+    async def test_run_process_and_cache_stores_model_json_and_attributes(self) -> None:
+        fake_client = FakeRedis()
+        analysis = sample_policy_analysis()
+        urls = ["https://example.com/privacy"]
+
+        with patch.object(
+            tos_router, "fetch_pages_content", AsyncMock(return_value=["Privacy text"])
+        ), patch.object(
+            tos_router, "_extract_policy_analysis", return_value=analysis
+        ), patch("app.queries.get_client", return_value=fake_client), patch(
+            "app.api.overlay_summary.get_client", return_value=fake_client
+        ), patch.object(
+            tos_router, "get_domain", return_value="example.com"
+        ), patch.object(
+            tos_router, "get_attribute_severity_map", return_value={}
+        ), patch.object(tos_router, "set_site_attributes_many") as set_attrs, patch(
+            "app.api.overlay_summary.store_overlay_payload"
+        ) as store_overlay:
+            await tos_router._run_process_and_cache(urls)
+
+        store_overlay.assert_called_once_with("example.com", "tos:process:example.com")
+
+        self.assertEqual(
+            fake_client.values["tos:process:example.com"],
+            analysis.model_dump_json().encode("utf-8"),
+        )
+        set_attrs.assert_called_once()
+        self.assertIn("precise_gps", set_attrs.call_args.args[1])
+        self.assertEqual(
+            fake_client.values["tos:pages:last"],
+            b'{"https://example.com/privacy":"Privacy text"}',
+        )
+        self.assertEqual(fake_client.expiry["tos:pages:last"], 3600)
+        content_key = tos_router._content_key_for_pages(["example.com"], ["Privacy text"])
         self.assertEqual(
-            result,
-            [
-                "Source: https://example.com/privacy\n\nPrivacy text",
-                "Source: https://example.com/terms\n\nTerms text",
-            ],
+            fake_client.values[content_key], analysis.model_dump_json().encode("utf-8")
+        )
+        self.assertEqual(fake_client.expiry[content_key], 30 * 24 * 3600)
+        self.assertEqual(fake_client.values["tos:process:example.com:gen"], b"1")
+
+    async def test_run_process_and_cache_reuses_analysis_only_for_the_same_domain(
+        self,
+    ) -> None:
+        fake_client = FakeRedis()
+        analysis = sample_policy_analysis()  # metadata.domain is example.com
+        content_key = tos_router._content_key_for_pages(["example.com"], ["Privacy text"])
+        fake_client.values[content_key] = analysis.model_dump_json().encode("utf-8")
+        other_analysis = analysis.model_copy(
+            update={"metadata": analysis.metadata.model_copy(update={"domain": "example.org"})}
         )
+
+        for domain in ("example.org", "example.com"):
+            with patch.object(
+                tos_router, "fetch_pages_content", AsyncMock(return_value=["Privacy text"])
+            ), patch.object(
+                tos_router, "_extract_policy_analysis", return_value=other_analysis
+            ) as extract, patch(
+                "app.queries.get_client", return_value=fake_client
+            ), patch(
+                "app.api.overlay_summary.get_client", return_value=fake_client
+            ), patch.object(
+                tos_router, "get_domain", return_value=domain
+            ), patch.object(
+                tos_router, "get_attribute_severity_map", return_value={}
+            ), patch.object(tos_router, "set_site_attributes_many"), patch(
+                "app.api.overlay_summary.store_overlay_payload"
+            ):
+                await tos_router._run_process_and_cache([f"https://{domain}/privacy"])
+
+            # Identical text on another site is extracted anew; the same site reuses it.
+            self.assertEqual(extract.called, domain == "example.org")
+            self.assertIn(
+                f'"domain":"{domain}"'.encode("utf-8"),
+                fake_client.values[f"tos:process:{domain}"],
+            )
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import unittest
+from unittest.mock import patch
+
+from app.utils import url_utils
+
+
+class UrlUtilsTests(unittest.TestCase):
+    def setUp(self) -> None:
+        url_utils.get_domain.cache_clear()
+
+    def test_get_domain_strips_subdomains(self) -> None:
+        self.assertEqual(
+            url_utils.get_domain("https://policies.google.com/terms"), "google.com"
+        )
+        self.assertEqual(
+            url_utils.get_domain("https://sub.example.co.uk:443/"), "example.co.uk"
+        )
+
+    def test_get_domain_is_memoized_per_url(self) -> None:
+        with patch.object(url_utils, "_EXTRACT", wraps=url_utils._EXTRACT) as extract:
+            url_utils.get_domain("https://example.co.uk/a")
+            url_utils.get_domain("https://example.co.uk/a")
+
+        self.assertEqual(extract.call_count, 1)
+
+    def test_simple_tld_fast_path_matches_the_suffix_list(self) -> None:
+        urls = [
+            "https://policies.google.com/terms",
+            "http://user:pw@a.b.example.org:8080/x?y#z",
+            "https://example.net",
+            "https://WWW.Example.COM/",
+            "https://www.example.com.co/",
+            "https://.com/",
+            "example.com/path",
+            "https://127.0.0.1/",
+        ]
+        with patch.object(url_utils, "_EXTRACT", wraps=url_utils._EXTRACT) as extract:
+            domains = [url_utils.get_domain(url) for url in urls]
+
+        expected = []
+        for url in urls:
+            ext = url_utils._EXTRACT(url)
+            expected.append(
+                f"{ext.domain}.{ext.suffix}" if ext.domain and ext.suffix else ext.domain
+            )
+        self.assertEqual(domains, expected)
+        self.assertEqual(extract.call_count, 5)
+
+    def test_package_export_resolves_lazily(self) -> None:
+        import app.utils
+
+        self.assertIs(app.utils.get_domain, url_utils.get_domain)
+        with self.assertRaises(AttributeError):
+            app.utils.not_a_utility